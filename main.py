@@ -1,31 +1,45 @@
 import sys
 import os
+import math
+import importlib.util
+import io
 import string
-from dataclasses import dataclass, field
-from typing import List, Dict, Tuple, Optional
+from bisect import bisect_right
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field, replace
+from functools import lru_cache
+from typing import TYPE_CHECKING, Callable, List, Dict, Set, Tuple, Optional, Union
 
 import numpy as np
-import cv2
-import pandas as pd
+
+# cv2 and pandas are slow to import and only needed once a file is dropped,
+# so they are imported on first use (see _import_cv2 and the Excel handlers).
+if TYPE_CHECKING:
+    import pandas as pd
 
 from PyQt6.QtCore import (
-    Qt, QRect, QPoint, QSize, pyqtSignal, QEvent
+    Qt, QRect, QPoint, QSize, pyqtSignal, QEvent, QTimer, QSignalBlocker,
+    QObject, QRunnable, QThreadPool, QAbstractListModel, QModelIndex, QEventLoop,
+    QBuffer, QIODevice
 )
 from PyQt6.QtGui import (
-    QPainter, QColor, QPen, QPixmap, QImage, QFont, QFontMetrics, QAction
+    QPainter, QColor, QPen, QPixmap, QImage, QFont, QFontMetrics, QAction, QTransform, QPixmapCache,
+    QStaticText, QImageWriter
 )
 from PyQt6.QtWidgets import (
     QApplication, QMainWindow, QWidget, QSplitter, QVBoxLayout, QHBoxLayout,
-    QLabel, QPushButton, QLineEdit, QScrollArea, QFileDialog, QMessageBox,
+    QLabel, QPushButton, QLineEdit, QListView, QStyledItemDelegate, QStyleOptionButton, QStyle,
+    QFileDialog, QMessageBox,
     QGroupBox, QFrame, QToolButton, QSizePolicy, QColorDialog
-    , QComboBox, QSpinBox, QDialog, QSlider
+    , QComboBox, QSpinBox, QDialog, QSlider, QProgressDialog
 )
 
 # -------------------------
 # Data structures
 # -------------------------
 
-@dataclass
+@dataclass(slots=True)
 class TextStyle:
     bold: bool = False
     italic: bool = False
@@ -36,7 +50,7 @@ class TextStyle:
     # Optional font family name. If empty, default system font is used.
     family: str = ""
 
-@dataclass
+@dataclass(slots=True)
 class MaskRegion:
     letter: str
     rect: QRect                 # in IMAGE coordinates (original size)
@@ -55,6 +69,182 @@ def load_qimage(path: str) -> Optional[QImage]:
     # Convert to a paintable format
     return img.convertToFormat(QImage.Format.Format_RGBA8888)
 
+@lru_cache(maxsize=None)
+def _import_cv2():
+    import cv2
+    # Let OpenCV use its optimized (SIMD / multi-threaded) code paths
+    cv2.setUseOptimized(True)
+    cv2.setNumThreads(os.cpu_count() or 1)
+    return cv2
+
+@lru_cache(maxsize=None)
+def _import_pil():
+    # Pillow's JPEG encoder (libjpeg-turbo) is faster than Qt's and releases the
+    # GIL, so exports use it when installed and fall back to QImage.save otherwise
+    try:
+        from PIL import Image
+    except ImportError:
+        return None
+    return Image
+
+@lru_cache(maxsize=None)
+def _import_turbojpeg():
+    # PyTurboJPEG calls libjpeg-turbo's SIMD DCT and color conversion directly
+    # and takes RGBA pixels as they are, skipping Pillow's RGB conversion pass.
+    # Optional: needs both the module and the libturbojpeg shared library.
+    if importlib.util.find_spec("turbojpeg") is None:
+        return None
+    from turbojpeg import TurboJPEG
+    try:
+        return TurboJPEG()
+    except (OSError, RuntimeError):
+        return None
+
+def _write_file(path: str, data) -> None:
+    # Hand the OS the whole file in one sequential write
+    with open(path, "wb", buffering=1 << 20) as f:
+        f.write(data)
+
+# Byte order of QImage.Format_RGB32 pixels (native 0xffRRGGBB words) in memory
+_RGB32_IS_BGRX = sys.byteorder == "little"
+
+def is_opaque(img: QImage) -> bool:
+    """Whether every pixel of an RGBA8888 QImage has alpha 255."""
+    return bool(qimage_to_ndarray(img)[..., 3].min() == 255)
+
+def qimage_to_pil_rgb(img: QImage):
+    """RGB Pillow copy of a QImage (the copy JPEG encoding needs anyway)."""
+    Image = _import_pil()
+    if img.format() == QImage.Format.Format_RGB32:
+        # Decoded straight from Qt's buffer to RGB in one pass
+        ptr = img.constBits()
+        ptr.setsize(img.sizeInBytes())
+        rawmode = "BGRX" if _RGB32_IS_BGRX else "XRGB"
+        return Image.frombuffer("RGB", (img.width(), img.height()), ptr, "raw", rawmode, img.bytesPerLine(), 1)
+    if img.format() != QImage.Format.Format_RGBA8888:
+        img = img.convertToFormat(QImage.Format.Format_RGBA8888)
+    return Image.fromarray(qimage_to_ndarray(img)).convert("RGB")
+
+def save_pil_jpg(rgb, path: str, quality: int = 90) -> bool:
+    """Encodes a Pillow image as JPEG; safe to call from worker threads."""
+    buf = io.BytesIO()
+    try:
+        # 4:2:0 chroma, baseline, no Huffman optimization pass: the fastest encode
+        rgb.save(buf, "JPEG", quality=quality, subsampling=2, optimize=False, progressive=False)
+        _write_file(path, buf.getbuffer())
+    except OSError:
+        return False
+    return True
+
+def save_turbo_jpg(pixels: np.ndarray, pixel_format: int, path: str, quality: int = 90) -> bool:
+    """Encodes an (h, w, 4) array in a turbojpeg TJPF_* layout; safe to call from worker threads."""
+    from turbojpeg import TJSAMP_420
+    try:
+        data = _import_turbojpeg().encode(pixels, quality=quality, pixel_format=pixel_format, jpeg_subsample=TJSAMP_420)
+        _write_file(path, data)
+    except OSError:
+        return False
+    return True
+
+def has_fast_jpeg() -> bool:
+    """Whether exports can encode off the GUI thread (libjpeg-turbo or Pillow)."""
+    return _import_turbojpeg() is not None or _import_pil() is not None
+
+def jpeg_snapshot(img: QImage):
+    """Copy of `img` in the form the fast encoder takes; pass it to save_snapshot_jpg."""
+    if _import_turbojpeg() is not None:
+        from turbojpeg import TJPF_BGRX, TJPF_RGBA, TJPF_XRGB
+        if img.format() == QImage.Format.Format_RGB32:
+            return qimage_to_ndarray(img).copy(), TJPF_BGRX if _RGB32_IS_BGRX else TJPF_XRGB
+        if img.format() != QImage.Format.Format_RGBA8888:
+            img = img.convertToFormat(QImage.Format.Format_RGBA8888)
+        return qimage_to_ndarray(img).copy(), TJPF_RGBA
+    return qimage_to_pil_rgb(img)
+
+def save_snapshot_jpg(snapshot, path: str, quality: int = 90) -> bool:
+    if isinstance(snapshot, tuple):
+        pixels, pixel_format = snapshot
+        return save_turbo_jpg(pixels, pixel_format, path, quality)
+    return save_pil_jpg(snapshot, path, quality)
+
+def write_qimage_jpg(img: QImage, path: str, quality: int = 90) -> bool:
+    """Qt's own JPEG encoder, for when neither turbojpeg nor Pillow is installed."""
+    buf = QBuffer()
+    buf.open(QIODevice.OpenModeFlag.WriteOnly)
+    writer = QImageWriter(buf, b"jpg")
+    writer.setQuality(quality)
+    # Baseline, no Huffman optimization pass (Qt's default chroma is already 4:2:0)
+    writer.setOptimizedWrite(False)
+    writer.setProgressiveScanWrite(False)
+    if not writer.write(img):
+        return False
+    try:
+        _write_file(path, buf.data().data())
+    except OSError:
+        return False
+    return True
+
+def save_qimage_jpg(img: QImage, path: str, quality: int = 90) -> bool:
+    if not has_fast_jpeg():
+        return write_qimage_jpg(img, path, quality)
+    return save_snapshot_jpg(jpeg_snapshot(img), path, quality)
+
+def _new_styled_font(family: str, size: int, bold: bool, italic: bool, underline: bool) -> Tuple[QFont, QFontMetrics]:
+    f = QFont()
+    if family:
+        f.setFamily(family)
+    f.setPointSize(size)
+    f.setBold(bold)
+    f.setItalic(italic)
+    f.setUnderline(underline)
+    return f, QFontMetrics(f)
+
+FontCache = Callable[[str, int, bool, bool, bool], Tuple[QFont, QFontMetrics]]
+
+def new_font_cache() -> FontCache:
+    """
+    A private (family, size, bold, italic, underline) -> (font, metrics) cache.
+    QFont and QFontMetrics are reentrant, not thread-safe (their engine data is
+    filled in lazily), so code off the UI thread makes one of these and keeps it
+    to itself for as long as its job runs, e.g. one RenderTilesTask.
+    """
+    return lru_cache(maxsize=1024)(_new_styled_font)
+
+# The UI thread's font cache (empty family -> the application default): canvas
+# labels and fitters built on the UI thread share it for the whole session.
+# Callers must not modify the returned objects, and pool threads must not use it.
+styled_font: FontCache = new_font_cache()
+
+# Shared fallback for letters without an explicit style; never mutated
+_DEFAULT_STYLE = TextStyle()
+
+def _letter_index(letter: str) -> int:
+    """Index of a mask letter ('a'..'z') in the canvas' per-letter lists."""
+    return ord(letter) - 97
+
+def qimage_to_ndarray(img: QImage) -> np.ndarray:
+    """Read-only (h, w, 4) view of a 32-bit QImage's pixels (no copy); channels are RGBA for RGBA8888."""
+    iw, ih = img.width(), img.height()
+    ptr = img.constBits()
+    ptr.setsize(img.sizeInBytes())
+    return np.frombuffer(ptr, np.uint8).reshape(ih, img.bytesPerLine())[:, :iw * 4].reshape(ih, iw, 4)
+
+def qimage_to_gray(img: QImage) -> np.ndarray:
+    """(h, w) uint8 luminance of a QImage: a no-copy view for Grayscale8, one cvtColor pass for RGBA8888."""
+    if img.format() == QImage.Format.Format_Grayscale8:
+        iw, ih = img.width(), img.height()
+        ptr = img.constBits()
+        ptr.setsize(img.sizeInBytes())
+        return np.frombuffer(ptr, np.uint8).reshape(ih, img.bytesPerLine())[:, :iw]
+    cv2 = _import_cv2()
+    return cv2.cvtColor(qimage_to_ndarray(img), cv2.COLOR_RGBA2GRAY)
+
+def scale_qimage_area(img: QImage, new_w: int, new_h: int) -> QImage:
+    """Resize an RGBA8888 QImage with cv2.INTER_AREA, without an intermediate copy of the source."""
+    cv2 = _import_cv2()
+    small = cv2.resize(qimage_to_ndarray(img), (new_w, new_h), interpolation=cv2.INTER_AREA)
+    return QImage(small.data, new_w, new_h, new_w * 4, QImage.Format.Format_RGBA8888).copy()
+
 def cv_rect_to_qrect(x, y, w, h) -> QRect:
     return QRect(int(x), int(y), int(w), int(h))
 
@@ -63,111 +253,189 @@ def qrect_to_tuple(r: QRect) -> Tuple[int, int, int, int]:
 
 def sort_rects_reading_order(rects: List[QRect]) -> List[QRect]:
     # Sort top-to-bottom, then left-to-right
-    return sorted(rects, key=lambda r: (r.y(), r.x()))
-
-def detect_blank_regions_cv(image_path: str, max_regions: int = 8) -> List[QRect]:
+    if not rects:
+        return []
+    xyxy = np.array([(r.x(), r.y(), r.x() + r.width(), r.y() + r.height()) for r in rects], dtype=np.int32)
+    return [rects[i] for i in np.lexsort((xyxy[:, 0], xyxy[:, 1]))]
+
+def sort_rects_reading_order_np(xyxy: np.ndarray) -> np.ndarray:
+    # Same ordering for an (N, 4) x1, y1, x2, y2 array
+    return xyxy[np.lexsort((xyxy[:, 0], xyxy[:, 1]))]
+
+# Morphology kernels used by detect_blank_regions_cv. They are full
+# rectangles on purpose: OpenCV recognizes an all-ones kernel and runs it as
+# separate row and column passes (O(K) per pixel, not O(K^2)). Splitting them
+# into (K, 1) and (1, K) dilations by hand adds a pass and measured slower.
+_KERNEL_5 = np.ones((5, 5), np.uint8)
+_KERNEL_7 = np.ones((7, 7), np.uint8)
+_KERNEL_23 = np.ones((23, 23), np.uint8)
+
+@lru_cache(maxsize=None)
+def _clahe():
+    """CLAHE instance shared by detection runs (created on first use, like cv2 itself)."""
+    return _import_cv2().createCLAHE(clipLimit=2.0, tileGridSize=(8, 8))
+
+def merge_nearby_rects(boxes: np.ndarray, gap: int = 10) -> np.ndarray:
+    """
+    Merge rects (N x 4 array of x1, y1, x2, y2) that overlap or lie within `gap`
+    pixels of each other, transitively. Returns the bounding box of each group.
+    """
+    n = len(boxes)
+    if n == 0:
+        return boxes
+    x1, y1, x2, y2 = boxes.T
+
+    # Union-find over the pairs that touch
+    parent = list(range(n))
+
+    def find(i: int) -> int:
+        while parent[i] != i:
+            parent[i] = parent[parent[i]]
+            i = parent[i]
+        return i
+
+    # Sweep left to right: a rect is only tested against the rects that started
+    # before it and still reach its left edge (within gap), not against all N.
+    active = np.empty(0, dtype=np.intp)
+    for i in np.argsort(x1, kind="stable").tolist():
+        active = active[x2[active] + gap > x1[i]]
+        touching = active[(y1[active] < y2[i] + gap) & (y1[i] < y2[active] + gap)]
+        root = find(i)
+        for j in touching.tolist():
+            rj = find(j)
+            if rj != root:
+                parent[rj] = root
+        active = np.append(active, i)
+
+    roots = np.array([find(i) for i in range(n)])
+    # Number groups by their smallest member, so the output order is stable
+    first = np.full(n, n)
+    np.minimum.at(first, roots, np.arange(n))
+    _, group = np.unique(first[roots], return_inverse=True)
+    count = group.max() + 1
+    out = np.empty((count, 4), dtype=boxes.dtype)
+    out[:, :2] = np.iinfo(boxes.dtype).max
+    out[:, 2:] = np.iinfo(boxes.dtype).min
+    np.minimum.at(out[:, 0], group, x1)
+    np.minimum.at(out[:, 1], group, y1)
+    np.maximum.at(out[:, 2], group, x2)
+    np.maximum.at(out[:, 3], group, y2)
+    return out
+
+def contour_bounding_rects(contours) -> np.ndarray:
+    """
+    (N, 4) int32 x, y, w, h of each contour, the same as cv2.boundingRect, but
+    computed for all contours at once from their concatenated points.
+    """
+    if len(contours) == 0:
+        return np.empty((0, 4), dtype=np.int32)
+    pts = np.concatenate(contours).reshape(-1, 2)
+    starts = np.zeros(len(contours), dtype=np.intp)
+    np.cumsum(np.fromiter(map(len, contours), dtype=np.intp, count=len(contours))[:-1], out=starts[1:])
+    lo = np.minimum.reduceat(pts, starts, axis=0)
+    hi = np.maximum.reduceat(pts, starts, axis=0)
+    return np.concatenate([lo, hi - lo + 1], axis=1).astype(np.int32)
+
+def _bright_ratios(ii: np.ndarray, boxes: np.ndarray) -> np.ndarray:
+    """Fraction of bright pixels in each (x, y, w, h) row of boxes, read from an integral image."""
+    x, y, w, h = boxes.T
+    count = ii[y + h, x + w] - ii[y, x + w] - ii[y + h, x] + ii[y, x]
+    return count / (w * h)
+
+def detect_blank_regions_cv(image: Union[str, QImage], max_regions: int = 8) -> List[QRect]:
     """
     Enhanced auto-detection of empty regions suitable for text placement.
     Uses multiple techniques including OCR and contour analysis.
+    `image` is a file path or an already loaded RGBA8888 or Grayscale8 QImage
+    (avoids decoding the file again). Everything below works on one byte per pixel.
     """
-    img = cv2.imread(image_path)
-    if img is None:
+    cv2 = _import_cv2()
+    if isinstance(image, QImage):
+        gray = qimage_to_gray(image)
+    else:
+        # Only the grayscale image is used, so decode straight to one channel
+        gray = cv2.imread(image, cv2.IMREAD_GRAYSCALE)
+    if gray is None:
         return []
-    h, w = img.shape[:2]
-    
-    # Convert to grayscale and enhance contrast
-    gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
-    clahe = cv2.createCLAHE(clipLimit=2.0, tileGridSize=(8,8))
-    enhanced = clahe.apply(gray)
+    h, w = gray.shape[:2]
+
+    # Work on a downscaled copy of large templates (max side 1024); the
+    # rectangles found are mapped back to original coordinates at the end
+    scale = min(1.0, 1024 / max(h, w))
+    if scale < 1.0:
+        gray = cv2.resize(gray, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA)
+        h, w = gray.shape[:2]
+    inv = 1.0 / scale
+
+    # Enhance contrast. UMat lets OpenCV run the filters below through
+    # OpenCL when available (plain CPU otherwise).
+    gray = cv2.UMat(gray)
+    enhanced = _clahe().apply(gray)
     
     # 1. Text Detection via Edge Analysis
     edges = cv2.Canny(enhanced, 50, 150)
-    kernel = np.ones((5, 5), np.uint8)
-    edges_dil = cv2.dilate(edges, kernel, iterations=2)
-    
-    # Create a text presence mask
-    text_mask = edges_dil.copy()
-    text_mask = cv2.dilate(text_mask, np.ones((15,15), np.uint8), iterations=1)
-    
+
+    # Create a text presence mask. Two 5x5 dilations followed by a 15x15 one
+    # equal a single 23x23 dilation, so do it in one pass.
+    text_mask = cv2.dilate(edges, _KERNEL_23, dst=edges, iterations=1)
+
     # 2. Potential Text Area Detection
-    # Threshold to find dark regions (potential text)
-    _, dark_mask = cv2.threshold(enhanced, 180, 255, cv2.THRESH_BINARY_INV)
-    dark_mask = cv2.dilate(dark_mask, np.ones((7,7), np.uint8), iterations=1)
-    
-    # Combine masks to get refined empty regions
-    empty_mask = cv2.bitwise_not(cv2.bitwise_or(text_mask, dark_mask))
-    
+    # Dark regions (potential text), dilated by 7x7, are only used inverted;
+    # eroding the bright complement gives NOT(dilate(dark)) directly
+    _, empty_mask = cv2.threshold(enhanced, 180, 255, cv2.THRESH_BINARY)
+    cv2.erode(empty_mask, _KERNEL_7, dst=empty_mask, iterations=1)
+
+    # Refined empty regions = NOT(text OR dark). With 0/255 masks the saturating
+    # subtract computes it in one pass, in place
+    cv2.subtract(empty_mask, text_mask, dst=empty_mask)
+
     # Clean up noise
-    empty_mask = cv2.erode(empty_mask, np.ones((5,5), np.uint8), iterations=1)
-    empty_mask = cv2.dilate(empty_mask, np.ones((7,7), np.uint8), iterations=1)
-    
+    cv2.erode(empty_mask, _KERNEL_5, dst=empty_mask, iterations=1)
+    cv2.dilate(empty_mask, _KERNEL_7, dst=empty_mask, iterations=1)
+
     # Find contours of empty regions
-    contours, _ = cv2.findContours(empty_mask, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+    contours, _ = cv2.findContours(empty_mask.get(), cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
     
     # Process contours to get rectangles
-    rects = []
     total_area = w * h
     min_area = total_area * 0.003  # Minimum area threshold
     max_area = total_area * 0.15   # Maximum area threshold
-    
-    for cnt in contours:
-        # Get bounding rectangle
-        x, y, ww, hh = cv2.boundingRect(cnt)
-        area = ww * hh
-        
-        # Filter based on size and aspect ratio
-        if area < min_area or area > max_area:
-            continue
-            
-        aspect_ratio = ww / hh if hh != 0 else 0
-        if aspect_ratio < 0.2 or aspect_ratio > 5:  # Filter extreme aspect ratios
-            continue
-            
-        # Check if rectangle is suitable for text
-        roi = enhanced[y:y+hh, x:x+ww]
-        if roi.size == 0:
-            continue
-            
-        # Calculate text-free percentage in ROI
-        text_free_ratio = np.sum(roi > 200) / roi.size
-        if text_free_ratio < 0.4:  # Must be at least 40% free of dark pixels
-            continue
-        
-        # Add rectangle with some padding
-        padding = int(min(ww, hh) * 0.1)
-        x = max(0, x - padding)
-        y = max(0, y - padding)
-        ww = min(w - x, ww + padding * 2)
-        hh = min(h - y, hh + padding * 2)
-        
-        rects.append(cv_rect_to_qrect(x, y, ww, hh))
-    
+
+    # Integral image of bright pixels: the bright count of any rect is 4 lookups.
+    # The 0/1 bright mask is built by OpenCV on the UMat, not as a numpy bool array.
+    # The text mask is no longer needed, so its buffer holds the 0/1 mask.
+    cv2.threshold(enhanced, 200, 1, cv2.THRESH_BINARY, dst=text_mask)
+    bright_ii = cv2.integral(text_mask.get())
+
+    # Bounding rects of all contours, filtered on size and aspect ratio in one pass
+    boxes = contour_bounding_rects(contours)
+    areas = boxes[:, 2] * boxes[:, 3]
+    aspect = boxes[:, 2] / np.maximum(boxes[:, 3], 1)
+    candidates = (areas > 0) & (areas >= min_area) & (areas <= max_area) & (aspect >= 0.2) & (aspect <= 5)
+
+    boxes = boxes[candidates]
+    # Text-free percentage of every candidate at once: at least 40% free of dark pixels
+    boxes = boxes[_bright_ratios(bright_ii, boxes) >= 0.4]
+
+    # Add rectangles with some padding
+    x, y, ww, hh = boxes.T
+    padding = (np.minimum(ww, hh) * 0.1).astype(np.int32)
+    x = np.maximum(0, x - padding)
+    y = np.maximum(0, y - padding)
+    ww = np.minimum(w - x, ww + padding * 2)
+    hh = np.minimum(h - y, hh + padding * 2)
+    rects = np.stack([x, y, x + ww, y + hh], axis=1)
+
+    # Back to original coordinates, rounding each edge (truncating would shrink
+    # every rect by up to a working-image pixel)
+    rects = np.rint(rects * inv).astype(np.int32)
+
     # Merge overlapping and nearby rectangles
-    merged = []
-    for r in sort_rects_reading_order(rects):
-        merged_flag = False
-        for j, m in enumerate(merged):
-            # Check for overlap or proximity
-            expanded = QRect(m)
-            expanded.adjust(-10, -10, 10, 10)
-            if r.intersects(expanded):
-                merged[j] = m.united(r)
-                merged_flag = True
-                break
-        if not merged_flag:
-            merged.append(r)
-    
-    # Final filtering and limiting
-    final_rects = []
-    for r in sort_rects_reading_order(merged):
-        # Ensure minimum dimensions for text
-        if r.width() >= 60 and r.height() >= 25:
-            final_rects.append(r)
-    
-    if len(final_rects) > max_regions:
-        final_rects = final_rects[:max_regions]
-    
-    return final_rects
+    merged = sort_rects_reading_order_np(merge_nearby_rects(rects))
+
+    # Final filtering and limiting: ensure minimum dimensions for text
+    keep = ((merged[:, 2] - merged[:, 0]) >= 60) & ((merged[:, 3] - merged[:, 1]) >= 25)
+    return [cv_rect_to_qrect(x1, y1, x2 - x1, y2 - y1) for x1, y1, x2, y2 in merged[keep][:max_regions]]
 
 def ensure_dir(path: str):
     if not os.path.exists(path):
@@ -309,157 +577,225 @@ class VarAssignPanel(QGroupBox):
         self.note.setStyleSheet("color:#666; font-size:12px;")
         self.outer.addWidget(self.note)
 
+        # Style edits are coalesced: at most one styleChanged per letter per frame
+        self._colors: Dict[str, QColor] = {}
+        self._pending_emits: Set[str] = set()
+        self._emit_timer = QTimer(self)
+        self._emit_timer.setSingleShot(True)
+        self._emit_timer.setInterval(16)
+        self._emit_timer.timeout.connect(self._flush_style)
+
+        # Row widgets are kept across set_variables calls and patched in place
+        self._row_widgets: Dict[str, QWidget] = {}
+        self._info_label: Optional[QLabel] = None
+
     def clear_rows(self):
         for i in reversed(range(self.container_layout.count())):
             w = self.container_layout.itemAt(i).widget()
             if w:
                 w.setParent(None)
         self.letter_rows.clear()
+        self._row_widgets.clear()
+        self._info_label = None
+        self._colors.clear()
+        self._pending_emits.clear()
+
+    def _remove_row(self, letter: str):
+        row = self._row_widgets.pop(letter, None)
+        if row is not None:
+            row.setParent(None)
+        self.letter_rows.pop(letter, None)
+        self._colors.pop(letter, None)
+        self._pending_emits.discard(letter)
+
+    @staticmethod
+    def _color_button_style(c: QColor) -> str:
+        return f"background: rgb({c.red()},{c.green()},{c.blue()}); color: white; font-weight:600;"
+
+    def _schedule_style(self, letter: str):
+        self._pending_emits.add(letter)
+        self._emit_timer.start()
+
+    def _on_edit_changed(self, text: str):
+        self.assignmentChanged.emit(self.sender().property("letter"), text)
+
+    def _on_style_edited(self, *_):
+        # Controls are read back from letter_rows when the timer fires
+        self._schedule_style(self.sender().property("letter"))
+
+    def _on_color_clicked(self):
+        letter = self.sender().property("letter")
+        cur = self._colors.get(letter, QColor(20, 20, 20))
+        col = QColorDialog.getColor(cur, self, "Choose text color")
+        if col.isValid() and letter in self.letter_rows:
+            # update button background
+            self.letter_rows[letter][4].setStyleSheet(self._color_button_style(col))
+            self._colors[letter] = col
+            self._schedule_style(letter)
+
+    def _on_delete_clicked(self):
+        self.deleteRequested.emit(self.sender().property("letter"))
+
+    def _flush_style(self):
+        pending, self._pending_emits = self._pending_emits, set()
+        for letter in sorted(pending):
+            row = self.letter_rows.get(letter)
+            if row is None:
+                continue
+            _, btn_b, btn_i, btn_u, _, size_spin, font_combo, _ = row
+            st = TextStyle(
+                bold=btn_b.isChecked(),
+                italic=btn_i.isChecked(),
+                underline=btn_u.isChecked(),
+                color=QColor(self._colors.get(letter, QColor(20, 20, 20))),
+                size=size_spin.value() if size_spin.value() > 0 else None,
+                family=font_combo.currentText() if font_combo.currentText() else ""
+            )
+            self.styleChanged.emit(letter, st)
 
     def set_variables(self, masks: List[MaskRegion]):
-        self.clear_rows()
-        for m in masks:
-            row = QWidget()
-            hl = QHBoxLayout(row)
-            hl.setContentsMargins(0, 0, 0, 0)
-            hl.setSpacing(6)
-
-            label = QLabel(f"{m.letter} =")
-            label.setFixedWidth(22)
-            label.setStyleSheet("font-weight:600;")
-
-            edit = QLineEdit()
-            edit.setPlaceholderText("Enter string (e.g., NAME)")
-            edit.setText(m.label_text)
-
-            # Formatting buttons
-            btn_b = QToolButton()
-            btn_b.setText("B")
-            btn_b.setCheckable(True)
-            btn_b.setChecked(m.style.bold)
-            btn_b.setToolTip("Bold")
-            btn_b.setStyleSheet("font-weight:bold;")
-
-            btn_i = QToolButton()
-            btn_i.setText("I")
-            btn_i.setCheckable(True)
-            btn_i.setChecked(m.style.italic)
-            btn_i.setToolTip("Italic")
-            btn_i.setStyleSheet("font-style:italic;")
-
-            btn_u = QToolButton()
-            btn_u.setText("U")
-            btn_u.setCheckable(True)
-            btn_u.setChecked(m.style.underline)
-            btn_u.setToolTip("Underline")
-            btn_u.setStyleSheet("text-decoration: underline;")
-
-            # Color picker button
-            btn_color = QToolButton()
-            btn_color.setText("◙")
-            btn_color.setToolTip("Pick color")
-            # set background to current color
-            c = m.style.color
-            btn_color.setStyleSheet(f"background: rgb({c.red()},{c.green()},{c.blue()}); color: white; font-weight:600;")
-            def make_color_picker(letter, button):
-                def _pick():
-                    # Use the mask's current style color (m is captured from outer loop)
-                    cur = m.style.color if hasattr(m.style, 'color') else QColor(20, 20, 20)
-                    col = QColorDialog.getColor(cur, self, "Choose text color")
-                    if col.isValid():
-                        # update button background
-                        button.setStyleSheet(f"background: rgb({col.red()},{col.green()},{col.blue()}); color: white; font-weight:600;")
-                        # preserve current size/family values if present
-                        try:
-                            fam = font_combo.currentText() if font_combo.currentText() else ''
-                            s_val = size_spin.value() if size_spin.value() > 0 else None
-                        except Exception:
-                            fam = getattr(m.style, 'family', '')
-                            s_val = getattr(m.style, 'size', None)
-                        st = TextStyle(bold=btn_b.isChecked(), italic=btn_i.isChecked(), underline=btn_u.isChecked(), color=col, size=s_val, family=fam)
-                        self.styleChanged.emit(letter, st)
-                return _pick
-
-            btn_color.clicked.connect(make_color_picker(m.letter, btn_color))
-
-            # Font size control (0 == auto)
-            size_spin = QSpinBox()
-            size_spin.setRange(0, 200)
-            size_spin.setFixedWidth(72)
-            size_spin.setToolTip("Font size in points (0 = auto)")
-            size_spin.setSpecialValueText("Auto")
-            size_val = m.style.size if getattr(m.style, 'size', None) else 0
-            size_spin.setValue(size_val)
-
-            # Font family dropdown
-            font_combo = QComboBox()
-            font_combo.setEditable(False)
-            font_combo.setFixedWidth(140)
-            common_fonts = ["", "Segoe UI", "Arial", "Times New Roman", "Georgia", "Courier New", "Roboto", "Inter"]
-            font_combo.addItems(common_fonts)
-            # preselect if present
-            if getattr(m.style, 'family', ''):
-                idx = font_combo.findText(m.style.family)
-                if idx >= 0:
-                    font_combo.setCurrentIndex(idx)
-            # NEW delete button
-            btn_del = QToolButton()
-            btn_del.setText("✕")
-            btn_del.setToolTip("Delete this variable")
-            btn_del.setStyleSheet("color: red; font-weight: bold;")
-            def make_delete(letter):
-                def _do_delete():
-                    self.deleteRequested.emit(letter)
-                return _do_delete
-            btn_del.clicked.connect(make_delete(m.letter))
-
-            def make_edit_changed(letter):
-                def _on_changed(text):
-                    self.assignmentChanged.emit(letter, text)
-                return _on_changed
-
-            edit.textChanged.connect(make_edit_changed(m.letter))
-
-            def make_style_toggled(letter):
-                def _update_style(*args):
-                    # Read current values from controls (captures btn_*, size_spin, font_combo)
-                    fam = font_combo.currentText() if font_combo.currentText() else ""
-                    s_val = size_spin.value() if size_spin.value() > 0 else None
-                    st = TextStyle(
-                        bold=btn_b.isChecked(),
-                        italic=btn_i.isChecked(),
-                        underline=btn_u.isChecked(),
-                        color=m.style.color if hasattr(m.style, 'color') else QColor(20,20,20),
-                        size=s_val,
-                        family=fam
-                    )
-                    self.styleChanged.emit(letter, st)
-                return _update_style
-
-            updater = make_style_toggled(m.letter)
-            btn_b.toggled.connect(lambda _: updater())
-            btn_i.toggled.connect(lambda _: updater())
-            btn_u.toggled.connect(lambda _: updater())
-            size_spin.valueChanged.connect(lambda _: updater())
-            font_combo.currentTextChanged.connect(lambda _: updater())
-
-            hl.addWidget(label)
-            hl.addWidget(edit, 1)
-            hl.addWidget(btn_b)
-            hl.addWidget(btn_i)
-            hl.addWidget(btn_u)
-            hl.addWidget(btn_color)
-            hl.addWidget(size_spin)
-            hl.addWidget(font_combo)
-            hl.addWidget(btn_del)  # NEW
-            self.container_layout.addWidget(row)
-
-            self.letter_rows[m.letter] = (edit, btn_b, btn_i, btn_u, btn_color, size_spin, font_combo, btn_del)
+        # Diff against the existing rows: drop removed letters, patch kept ones
+        # in place (keeps focus and cursor) and only build rows for new letters.
+        letters = {m.letter for m in masks}
+        for letter in [l for l in self._row_widgets if l not in letters]:
+            self._remove_row(letter)
+        if self._info_label is not None:
+            self._info_label.setParent(None)
+            self._info_label = None
+
+        for pos, m in enumerate(masks):
+            row = self._row_widgets.get(m.letter)
+            if row is None:
+                row = self._build_row(m)
+            else:
+                self._sync_row(m)
+            if self.container_layout.indexOf(row) != pos:
+                self.container_layout.removeWidget(row)
+                self.container_layout.insertWidget(pos, row)
 
         if not masks:
             info = QLabel("No masks detected. Add manually on the Preview → Manual Masking.")
             info.setStyleSheet("color:#a33;")
             self.container_layout.addWidget(info)
+            self._info_label = info
+
+    def _sync_row(self, m: MaskRegion):
+        """Update an existing row's controls from m without emitting any signals."""
+        edit, btn_b, btn_i, btn_u, btn_color, size_spin, font_combo, _ = self.letter_rows[m.letter]
+        if edit.text() != m.label_text:
+            with QSignalBlocker(edit):
+                edit.setText(m.label_text)
+        for btn, checked in ((btn_b, m.style.bold), (btn_i, m.style.italic), (btn_u, m.style.underline)):
+            with QSignalBlocker(btn):
+                btn.setChecked(checked)
+        with QSignalBlocker(size_spin):
+            size_spin.setValue(m.style.size if getattr(m.style, 'size', None) else 0)
+        with QSignalBlocker(font_combo):
+            idx = font_combo.findText(getattr(m.style, 'family', '') or "")
+            font_combo.setCurrentIndex(max(idx, 0))
+        c = m.style.color
+        if self._colors.get(m.letter) != c:
+            btn_color.setStyleSheet(self._color_button_style(c))
+            self._colors[m.letter] = QColor(c)
+
+    def _build_row(self, m: MaskRegion) -> QWidget:
+        row = QWidget()
+        hl = QHBoxLayout(row)
+        hl.setContentsMargins(0, 0, 0, 0)
+        hl.setSpacing(6)
+
+        label = QLabel(f"{m.letter} =")
+        label.setFixedWidth(22)
+        label.setStyleSheet("font-weight:600;")
+
+        edit = QLineEdit()
+        edit.setPlaceholderText("Enter string (e.g., NAME)")
+        edit.setText(m.label_text)
+
+        # Formatting buttons
+        btn_b = QToolButton()
+        btn_b.setText("B")
+        btn_b.setCheckable(True)
+        btn_b.setChecked(m.style.bold)
+        btn_b.setToolTip("Bold")
+        btn_b.setStyleSheet("font-weight:bold;")
+
+        btn_i = QToolButton()
+        btn_i.setText("I")
+        btn_i.setCheckable(True)
+        btn_i.setChecked(m.style.italic)
+        btn_i.setToolTip("Italic")
+        btn_i.setStyleSheet("font-style:italic;")
+
+        btn_u = QToolButton()
+        btn_u.setText("U")
+        btn_u.setCheckable(True)
+        btn_u.setChecked(m.style.underline)
+        btn_u.setToolTip("Underline")
+        btn_u.setStyleSheet("text-decoration: underline;")
+
+        # Color picker button
+        btn_color = QToolButton()
+        btn_color.setText("◙")
+        btn_color.setToolTip("Pick color")
+        # set background to current color
+        c = m.style.color
+        btn_color.setStyleSheet(self._color_button_style(c))
+        self._colors[m.letter] = QColor(c)
+
+        # Font size control (0 == auto)
+        size_spin = QSpinBox()
+        size_spin.setRange(0, 200)
+        size_spin.setFixedWidth(72)
+        size_spin.setToolTip("Font size in points (0 = auto)")
+        size_spin.setSpecialValueText("Auto")
+        size_val = m.style.size if getattr(m.style, 'size', None) else 0
+        size_spin.setValue(size_val)
+
+        # Font family dropdown
+        font_combo = QComboBox()
+        font_combo.setEditable(False)
+        font_combo.setFixedWidth(140)
+        common_fonts = ["", "Segoe UI", "Arial", "Times New Roman", "Georgia", "Courier New", "Roboto", "Inter"]
+        font_combo.addItems(common_fonts)
+        # preselect if present
+        if getattr(m.style, 'family', ''):
+            idx = font_combo.findText(m.style.family)
+            if idx >= 0:
+                font_combo.setCurrentIndex(idx)
+        # NEW delete button
+        btn_del = QToolButton()
+        btn_del.setText("✕")
+        btn_del.setToolTip("Delete this variable")
+        btn_del.setStyleSheet("color: red; font-weight: bold;")
+
+        # Every control carries its row's letter and shares one slot per kind,
+        # so no per-row closures are created
+        for w in (edit, btn_b, btn_i, btn_u, btn_color, size_spin, font_combo, btn_del):
+            w.setProperty("letter", m.letter)
+        edit.textChanged.connect(self._on_edit_changed)
+        btn_b.toggled.connect(self._on_style_edited)
+        btn_i.toggled.connect(self._on_style_edited)
+        btn_u.toggled.connect(self._on_style_edited)
+        size_spin.valueChanged.connect(self._on_style_edited)
+        font_combo.currentTextChanged.connect(self._on_style_edited)
+        btn_color.clicked.connect(self._on_color_clicked)
+        btn_del.clicked.connect(self._on_delete_clicked)
+
+        hl.addWidget(label)
+        hl.addWidget(edit, 1)
+        hl.addWidget(btn_b)
+        hl.addWidget(btn_i)
+        hl.addWidget(btn_u)
+        hl.addWidget(btn_color)
+        hl.addWidget(size_spin)
+        hl.addWidget(font_combo)
+        hl.addWidget(btn_del)  # NEW
+        self.container_layout.addWidget(row)
+
+        self.letter_rows[m.letter] = (edit, btn_b, btn_i, btn_u, btn_color, size_spin, font_combo, btn_del)
+        self._row_widgets[m.letter] = row
+        return row
 
 # -------------------------
 # Template Preview Canvas
@@ -475,8 +811,12 @@ class TemplateCanvas(QWidget):
         self.image: Optional[QImage] = None
         self.display_pixmap: Optional[QPixmap] = None
         self.masks: List[MaskRegion] = []
+        self._idx_by_letter: Dict[str, int] = {}  # letter -> index in self.masks
         self.assignments: Dict[str, str] = {}    # letter -> label text
         self.styles: Dict[str, TextStyle] = {}   # letter -> style
+        # Same data as lists indexed by letter ordinal ('a' -> 0), for paintEvent
+        self._assign_arr: List[Optional[str]] = [None] * 26
+        self._style_arr: List[TextStyle] = [_DEFAULT_STYLE] * 26
         self.manual_mode = False
 
         # For drawing rectangles in manual mode
@@ -491,32 +831,115 @@ class TemplateCanvas(QWidget):
         self.edit_start_pos: Optional[QPoint] = None
         self.edit_start_rect: Optional[QRect] = None
         self.edit_start_rotation: Optional[float] = None
+        # Rotate drags: display-space center of the mask and the angle at press
+        self._rotate_center: Tuple[int, int] = (0, 0)
+        self._rotate_start_angle = 0.0
         self.handle_radius = 4  # Reduced size of handles
         self.rotate_handle_offset = 20  # Adjusted offset for rotation handle
+        # Painter state shared by every paintEvent
+        self._bg_color = QColor(245, 245, 245)
+        self._pen_placeholder = QPen(QColor(160, 160, 160), 1, Qt.PenStyle.DashLine)
+        self._pen_mask = QPen(QColor(220, 50, 50), 2, Qt.PenStyle.SolidLine)
+        self._pen_handle = QPen(QColor(50, 120, 230), 2)
+        self._pen_drag = QPen(QColor(50, 120, 230), 2, Qt.PenStyle.DashLine)
+        self._handle_fill = QColor(220, 240, 255)
+        self._rotate_fill = self._handle_fill.darker(110)
         self._last_cursor_pos: Optional[QPoint] = None
 
+        # Last smooth-scaled display pixmap, keyed by its (width, height)
+        self._cached_scaled: Optional[Tuple[Tuple[int, int], QPixmap]] = None
+        # One smooth rescale once resizing has paused, however many resize events came in
+        self._smooth_timer = QTimer(self)
+        self._smooth_timer.setSingleShot(True)
+        self._smooth_timer.setInterval(200)
+        self._smooth_timer.timeout.connect(self._smooth_rescale)
+        # Drag repaints are coalesced: at most one per frame, covering everything dirtied since
+        self._pending_dirty = QRect()
+        self._repaint_timer = QTimer(self)
+        self._repaint_timer.setSingleShot(True)
+        self._repaint_timer.setInterval(16)
+        self._repaint_timer.timeout.connect(self._flush_update)
+
+        # Cached display geometry (image -> display), refreshed by _update_display_geometry
+        self._sx = 1.0
+        self._sy = 1.0
+        self._sx_img = 1.0  # display -> image, i.e. 1 / _sx
+        self._sy_img = 1.0
+        self._canvas_origin = QPoint(0, 0)
+        self._canvas_rect_cached = QRect(0, 0, 0, 0)
+        self._mask_display_rects: List[QRect] = []  # parallel to self.masks
+        self._rects_xyxy = np.empty((0, 4), dtype=np.int32)  # same rects as x1, y1, x2, y2 rows
+
+        # Label rendering cache: (font key, text) -> (w, h, descent, QStaticText).
+        # Labels are redrawn on every drag step; QStaticText keeps their glyph layout.
+        # Least recently used entries are dropped past text_size_cache_limit, since
+        # typing a label adds one entry per keystroke.
+        self._text_size_cache: "OrderedDict[tuple, Tuple[int, int, int, QStaticText]]" = OrderedDict()
+        self.text_size_cache_limit = 256
+
     def set_image(self, img: Optional[QImage]):
         self.image = img
+        self._cached_scaled = None
         self._update_display_pixmap()
+        self._update_display_geometry()
         self.update()
 
     def set_masks(self, masks: List[MaskRegion]):
         self.masks = masks
+        self._idx_by_letter = {m.letter: i for i, m in enumerate(masks)}
+        self._update_mask_display_rects()
         self.update()
 
     def set_assignments(self, assignments: Dict[str, str]):
         self.assignments = assignments
+        self._assign_arr = [None] * 26
+        for letter, text in assignments.items():
+            self._assign_arr[_letter_index(letter)] = text
+        self._text_size_cache.clear()
         self.update()
 
     def set_styles(self, styles: Dict[str, TextStyle]):
         self.styles = styles
+        self._style_arr = [_DEFAULT_STYLE] * 26
+        for letter, st in styles.items():
+            self._style_arr[_letter_index(letter)] = st
+        self._text_size_cache.clear()
         self.update()
 
+    def update_assignment(self, letter: str, text: str):
+        """Changes one mask's label, repainting only that mask."""
+        old_dirty = self._letter_dirty_rect(letter)
+        self.assignments[letter] = text
+        self._assign_arr[_letter_index(letter)] = text
+        self._repaint_letter(letter, old_dirty)
+
+    def update_style(self, letter: str, style: TextStyle):
+        """Changes one mask's style, repainting only that mask."""
+        old_dirty = self._letter_dirty_rect(letter)
+        self.styles[letter] = style
+        self._style_arr[_letter_index(letter)] = style
+        self._repaint_letter(letter, old_dirty)
+
+    def _letter_dirty_rect(self, letter: str) -> Optional[QRect]:
+        idx = self._idx_by_letter.get(letter)
+        if idx is None or idx >= len(self._mask_display_rects):
+            return None
+        return self._mask_dirty_rect(idx)
+
+    def _repaint_letter(self, letter: str, old_dirty: Optional[QRect]):
+        new_dirty = self._letter_dirty_rect(letter)
+        if old_dirty is None or new_dirty is None:
+            self.update()
+        else:
+            self.update(old_dirty.united(new_dirty))
+
     def set_manual_mode(self, enabled: bool):
         self.manual_mode = enabled
-        self.update()
+        # The mode itself draws nothing; only a rubber band left on screen needs erasing
+        if self.drag_start and self.drag_current:
+            self.update(QRect(self.drag_start, self.drag_current).normalized().adjusted(-2, -2, 2, 2))
 
-    def _update_display_pixmap(self):
+    def _update_display_pixmap(self, smooth: bool = True):
         if self.image is None:
             self.display_pixmap = None
             return
@@ -529,82 +952,127 @@ class TemplateCanvas(QWidget):
         scale = min(avail.width() / iw, avail.height() / ih)
         new_w = int(iw * scale)
         new_h = int(ih * scale)
-        scaled = self.image.scaled(new_w, new_h, Qt.AspectRatioMode.KeepAspectRatio, Qt.TransformationMode.SmoothTransformation)
-        self.display_pixmap = QPixmap.fromImage(scaled)
+        if self._cached_scaled is not None and self._cached_scaled[0] == (new_w, new_h):
+            self.display_pixmap = self._cached_scaled[1]
+            return
+        if not smooth and self.display_pixmap is not None and self.display_pixmap.size() == QSize(new_w, new_h):
+            # Already a (fast) pixmap of this size; the pending smooth pass will replace it
+            return
+        if smooth and scale < 0.5 and self.image.format() == QImage.Format.Format_RGBA8888:
+            # Large downscale: OpenCV's area averaging is faster and sharper than Qt's smooth path
+            scaled = scale_qimage_area(self.image, new_w, new_h)
+        else:
+            mode = Qt.TransformationMode.SmoothTransformation if smooth else Qt.TransformationMode.FastTransformation
+            scaled = self.image.scaled(new_w, new_h, Qt.AspectRatioMode.KeepAspectRatio, mode)
+        # Upload as is; the scaled image is already in a format the raster engine paints
+        self.display_pixmap = QPixmap.fromImage(scaled, Qt.ImageConversionFlag.NoFormatConversion)
+        if smooth:
+            self._cached_scaled = ((new_w, new_h), self.display_pixmap)
 
     def resizeEvent(self, event):
-        self._update_display_pixmap()
+        # Cheap rescale while the size is changing; the smooth pass follows once it settles
+        self._update_display_pixmap(smooth=False)
+        self._update_display_geometry()
+        self._smooth_timer.start()
         super().resizeEvent(event)
 
+    def _smooth_rescale(self):
+        self._update_display_pixmap()
+        self._update_display_geometry()
+        self.update()
+
+    def _update_display_geometry(self):
+        """Cache the image->display scale, canvas rect and mask display rects."""
+        if self.image is None or self.display_pixmap is None:
+            self._sx = self._sy = 1.0
+            self._sx_img = self._sy_img = 1.0
+            self._canvas_origin = QPoint(0, 0)
+            self._canvas_rect_cached = QRect(0, 0, 0, 0)
+            self._mask_display_rects = []
+            self._rects_xyxy = np.empty((0, 4), dtype=np.int32)
+            return
+        self._sx = self.display_pixmap.width() / self.image.width()
+        self._sy = self.display_pixmap.height() / self.image.height()
+        self._sx_img = self.image.width() / self.display_pixmap.width()
+        self._sy_img = self.image.height() / self.display_pixmap.height()
+        self._canvas_rect_cached = self._canvas_rect()
+        self._canvas_origin = self._canvas_rect_cached.topLeft()
+        self._update_mask_display_rects()
+
+    def _image_to_display_rect(self, r: QRect) -> QRect:
+        ox, oy = self._canvas_origin.x(), self._canvas_origin.y()
+        return QRect(int(ox + r.x() * self._sx), int(oy + r.y() * self._sy),
+                     int(r.width() * self._sx), int(r.height() * self._sy))
+
+    def _update_mask_display_rects(self):
+        self._mask_display_rects = [self._image_to_display_rect(m.rect) for m in self.masks]
+        self._rects_xyxy = np.array(
+            [(r.x(), r.y(), r.x() + r.width(), r.y() + r.height()) for r in self._mask_display_rects],
+            dtype=np.int32,
+        ).reshape(-1, 4)
+
+    def _update_mask_display_rect(self, idx: int):
+        r = self._image_to_display_rect(self.masks[idx].rect)
+        self._mask_display_rects[idx] = r
+        self._rects_xyxy[idx] = (r.x(), r.y(), r.x() + r.width(), r.y() + r.height())
+
     def paintEvent(self, event):
         painter = QPainter(self)
-        painter.fillRect(self.rect(), QColor(245, 245, 245))
+        dirty = event.rect()
+        painter.fillRect(dirty, self._bg_color)
         if self.display_pixmap is None:
             # No image yet
-            painter.setPen(QPen(QColor(160, 160, 160), 1, Qt.PenStyle.DashLine))
+            painter.setPen(self._pen_placeholder)
             painter.drawRect(self.rect().adjusted(5, 5, -5, -5))
             painter.drawText(self.rect(), Qt.AlignmentFlag.AlignCenter, "Drop a certificate template on the left")
             return
 
-        # Draw scaled image centered
-        canvas_rect = self._canvas_rect()
-        painter.drawPixmap(canvas_rect.topLeft(), self.display_pixmap)
-
-        # Scaling factors: image -> display
-        iw, ih = self.image.width(), self.image.height()
-        disp_w, disp_h = self.display_pixmap.width(), self.display_pixmap.height()
-        sx = disp_w / iw
-        sy = disp_h / ih
+        # Draw scaled image centered; only the part inside the dirty region
+        canvas_rect = self._canvas_rect_cached
+        target = dirty.intersected(canvas_rect)
+        if not target.isEmpty():
+            painter.drawPixmap(target, self.display_pixmap, target.translated(-canvas_rect.topLeft()))
 
         # Draw masks: always draw label text; draw red boundary and handles only for selected mask
         for idx, m in enumerate(self.masks):
-            x, y, w, h = qrect_to_tuple(m.rect)
-            rx = int(canvas_rect.x() + x * sx)
-            ry = int(canvas_rect.y() + y * sy)
-            rw = int(w * sx)
-            rh = int(h * sy)
+            rx, ry, rw, rh = qrect_to_tuple(self._mask_display_rects[idx])
 
             # --- Rotation support ---
-            painter.save()
-            cx = rx + rw // 2
-            cy = ry + rh // 2
-            painter.translate(cx, cy)
-            painter.rotate(m.rotation)
-            painter.translate(-cx, -cy)
+            # Unrotated masks (the usual case) draw without touching the transform
+            rotated = m.rotation != 0.0
+            if rotated:
+                painter.save()
+                cx = rx + rw // 2
+                cy = ry + rh // 2
+                painter.translate(cx, cy)
+                painter.rotate(m.rotation)
+                painter.translate(-cx, -cy)
 
             # Draw boundary only for selected mask
             if self.selected_mask_idx == idx:
-                painter.setPen(QPen(QColor(220, 50, 50), 2, Qt.PenStyle.SolidLine))
-                painter.drawRect(QRect(rx, ry, rw, rh))
+                painter.setPen(self._pen_mask)
+                painter.drawRect(rx, ry, rw, rh)
 
             # Draw the assigned label text; respect per-variable font family if set
-            label = self.assignments.get(m.letter, m.label_text)
+            li = _letter_index(m.letter)
+            label = self._assign_arr[li]
+            if label is None:
+                label = m.label_text
             if label:
-                st = self.styles.get(m.letter, TextStyle())
-                # Default preview size 20 unless a size is set; then use that size for clarity
-                preview_size = int(getattr(st, 'size', 0)) if getattr(st, 'size', None) else 20
-                fam = getattr(st, 'family', '')
-                if fam:
-                    f = QFont(fam, preview_size)
-                else:
-                    f = QFont("Arial", preview_size)
-                f.setBold(st.bold)
-                f.setItalic(st.italic)
-                f.setUnderline(st.underline)
-                painter.setFont(f)
+                st = self._style_arr[li]
+                key = self._font_key(st)
+                painter.setFont(self._preview_font(key)[0])
                 painter.setPen(st.color if hasattr(st, 'color') else QColor(20,20,20))
-                fm = QFontMetrics(f)
-                tw = fm.horizontalAdvance(label)
-                th = fm.height()
+                tw, th, descent, static = self._label_size(key, label)
                 tx = rx + (rw - tw) // 2
-                ty = ry + (rh + th) // 2 - fm.descent()
-                painter.drawText(tx, ty, label)
+                ty = ry + (rh + th) // 2 - descent
+                # drawStaticText takes the top-left corner rather than the baseline
+                painter.drawStaticText(tx, ty - (th - descent), static)
 
             # --- Interactive controls overlay: only for selected mask ---
             if self.selected_mask_idx == idx:
-                handle_color = QColor(50, 120, 230)
-                handle_fill = QColor(220, 240, 255)
-                painter.setPen(QPen(handle_color, 2))
+                handle_fill = self._handle_fill
+                painter.setPen(self._pen_handle)
                 painter.setBrush(handle_fill)
                 # Get 8 handle positions (corners + edges)
                 pts = [
@@ -622,77 +1090,104 @@ class TemplateCanvas(QWidget):
                 # Rotate handle (above top center)
                 rot_px = rx + rw // 2
                 rot_py = ry - self.rotate_handle_offset
-                painter.setBrush(handle_fill.darker(110))
+                painter.setBrush(self._rotate_fill)
                 painter.drawEllipse(QPoint(rot_px, rot_py), self.handle_radius + 2, self.handle_radius + 2)
                 painter.drawText(QRect(rot_px - 10, rot_py - 10, 20, 20), Qt.AlignmentFlag.AlignCenter, "⟳")
                 # Drag handle (center)
                 painter.setBrush(handle_fill)
                 painter.drawEllipse(QPoint(rx + rw // 2, ry + rh // 2), self.handle_radius + 1, self.handle_radius + 1)
+                painter.setBrush(Qt.BrushStyle.NoBrush)
 
-            painter.restore()
+            if rotated:
+                painter.restore()
 
         # Draw manual selection rectangle while dragging
         if self.manual_mode and self.dragging and self.drag_start and self.drag_current:
-            painter.setPen(QPen(QColor(50, 120, 230), 2, Qt.PenStyle.DashLine))
+            painter.setPen(self._pen_drag)
             painter.drawRect(QRect(self.drag_start, self.drag_current))
 
+    @staticmethod
+    def _font_key(st: TextStyle) -> tuple:
+        # Default preview size 20 unless a size is set; then use that size for clarity
+        preview_size = int(getattr(st, 'size', 0)) if getattr(st, 'size', None) else 20
+        fam = getattr(st, 'family', '') or "Arial"
+        return (fam, preview_size, st.bold, st.italic, st.underline)
+
+    def _preview_font(self, key: tuple) -> Tuple[QFont, QFontMetrics]:
+        # key is (family, size, bold, italic, underline), styled_font's arguments
+        return styled_font(*key)
+
+    def _label_size(self, key: tuple, label: str) -> Tuple[int, int, int, QStaticText]:
+        """(advance width, height, descent, laid out text) of label in the preview font for key."""
+        cache = self._text_size_cache
+        cached = cache.get((key, label))
+        if cached is None:
+            f, fm = self._preview_font(key)
+            static = QStaticText(label)
+            static.setTextFormat(Qt.TextFormat.PlainText)
+            static.prepare(QTransform(), f)
+            cached = cache[(key, label)] = (fm.horizontalAdvance(label), fm.height(), fm.descent(), static)
+            if len(cache) > self.text_size_cache_limit:
+                cache.popitem(last=False)
+        else:
+            cache.move_to_end((key, label))
+        return cached
+
+    def _mask_dirty_rect(self, idx: int) -> QRect:
+        """Display-space area painted for mask idx: box, label, handles and rotation."""
+        m = self.masks[idx]
+        box = QRect(self._mask_display_rects[idx])
+        li = _letter_index(m.letter)
+        label = self._assign_arr[li]
+        if label is None:
+            label = m.label_text
+        if label:
+            tw, th, _, _ = self._label_size(self._font_key(self._style_arr[li]), label)
+            text_rect = QRect(0, 0, tw, th)
+            text_rect.moveCenter(box.center())
+            box = box.united(text_rect)
+        # Room for the rotate handle above the box and the other handles around it
+        margin = self.rotate_handle_offset + self.handle_radius + 12
+        box = box.adjusted(-margin, -margin, margin, margin)
+        if m.rotation:
+            center = box.center()
+            xf = QTransform().translate(center.x(), center.y()).rotate(m.rotation).translate(-center.x(), -center.y())
+            box = xf.mapRect(box)
+        return box
+
     # --- Helper: hit test for handles and mask selection ---
     def _mask_hit_test(self, pos: QPoint) -> Optional[int]:
         # Returns index of mask under pos (in display coords)
-        if self.image is None or self.display_pixmap is None:
+        if self.image is None or self.display_pixmap is None or len(self._rects_xyxy) == 0:
             return None
-        canvas_rect = self._canvas_rect()
-        iw, ih = self.image.width(), self.image.height()
-        disp_w, disp_h = self.display_pixmap.width(), self.display_pixmap.height()
-        sx = disp_w / iw
-        sy = disp_h / ih
-        for idx, m in enumerate(self.masks):
-            x, y, w, h = qrect_to_tuple(m.rect)
-            rx = int(canvas_rect.x() + x * sx)
-            ry = int(canvas_rect.y() + y * sy)
-            rw = int(w * sx)
-            rh = int(h * sy)
-            # Apply rotation for hit test (approximate by bounding box)
-            box = QRect(rx, ry, rw, rh)
-            if box.contains(pos):
-                return idx
-        return None
+        # Rotation is approximated by the unrotated bounding box
+        r = self._rects_xyxy
+        px, py = pos.x(), pos.y()
+        hits = (px >= r[:, 0]) & (px < r[:, 2]) & (py >= r[:, 1]) & (py < r[:, 3])
+        idx = int(hits.argmax())
+        return idx if hits[idx] else None
 
     def _handle_hit_test(self, pos: QPoint, mask_idx: int) -> Optional[str]:
         # Returns which handle is under pos, or None
         if self.image is None or self.display_pixmap is None or mask_idx is None:
             return None
-        canvas_rect = self._canvas_rect()
-        iw, ih = self.image.width(), self.image.height()
-        disp_w, disp_h = self.display_pixmap.width(), self.display_pixmap.height()
-        sx = disp_w / iw
-        sy = disp_h / ih
-        m = self.masks[mask_idx]
-        x, y, w, h = qrect_to_tuple(m.rect)
-        rx = int(canvas_rect.x() + x * sx)
-        ry = int(canvas_rect.y() + y * sy)
-        rw = int(w * sx)
-        rh = int(h * sy)
-        pts = [
-            (rx, ry, 'nw'),
-            (rx + rw // 2, ry, 'n'),
-            (rx + rw, ry, 'ne'),
-            (rx + rw, ry + rh // 2, 'e'),
-            (rx + rw, ry + rh, 'se'),
-            (rx + rw // 2, ry + rh, 's'),
-            (rx, ry + rh, 'sw'),
-            (rx, ry + rh // 2, 'w')
-        ]
-        for px, py, name in pts:
-            if abs(px - pos.x()) <= self.handle_radius + 4 and abs(py - pos.y()) <= self.handle_radius + 4:
+        rx, ry, rw, rh = qrect_to_tuple(self._mask_display_rects[mask_idx])
+        # Work relative to the mask's top-left with the pointer read once
+        dx, dy = pos.x() - rx, pos.y() - ry
+        hw, hh = rw // 2, rh // 2
+        tol = self.handle_radius + 4
+        for px, py, name in (
+            (0, 0, 'nw'), (hw, 0, 'n'), (rw, 0, 'ne'), (rw, hh, 'e'),
+            (rw, rh, 'se'), (hw, rh, 's'), (0, rh, 'sw'), (0, hh, 'w'),
+        ):
+            if abs(px - dx) <= tol and abs(py - dy) <= tol:
                 return name
         # Rotate handle
-        rot_px = rx + rw // 2
-        rot_py = ry - self.rotate_handle_offset
-        if abs(rot_px - pos.x()) <= self.handle_radius + 6 and abs(rot_py - pos.y()) <= self.handle_radius + 6:
+        rot_tol = self.handle_radius + 6
+        if abs(hw - dx) <= rot_tol and abs(-self.rotate_handle_offset - dy) <= rot_tol:
             return 'rotate'
         # Drag handle (center)
-        if abs((rx + rw // 2) - pos.x()) <= self.handle_radius + 4 and abs((ry + rh // 2) - pos.y()) <= self.handle_radius + 4:
+        if abs(hw - dx) <= tol and abs(hh - dy) <= tol:
             return 'move'
         return None
 
@@ -703,11 +1198,12 @@ class TemplateCanvas(QWidget):
                 self.dragging = True
                 self.drag_start = event.position().toPoint()
                 self.drag_current = self.drag_start
-                self.update()
+                self.update(QRect(self.drag_start, self.drag_current).adjusted(-2, -2, 2, 2))
             return
 
         pos = event.position().toPoint()
         mask_idx = self._mask_hit_test(pos)
+        prev_idx = self.selected_mask_idx
         if mask_idx is not None:
             self.selected_mask_idx = mask_idx
             handle = self._handle_hit_test(pos, mask_idx)
@@ -716,19 +1212,29 @@ class TemplateCanvas(QWidget):
             self.edit_start_pos = pos
             self.edit_start_rect = QRect(self.masks[mask_idx].rect)
             self.edit_start_rotation = self.masks[mask_idx].rotation
+            if handle == 'rotate':
+                # The rect does not change while rotating, so its center is fixed
+                x, y, w, h = qrect_to_tuple(self.edit_start_rect)
+                o = self._canvas_origin
+                cx = int(o.x() + (x + w // 2) * self._sx)
+                cy = int(o.y() + (y + h // 2) * self._sy)
+                self._rotate_center = (cx, cy)
+                self._rotate_start_angle = math.atan2(pos.y() - cy, pos.x() - cx)
             self._last_cursor_pos = pos
-            self.update()
         else:
             self.selected_mask_idx = None
             self.edit_mode = None
             self.handle_type = None
-            self.update()
+        # Only the previously and newly selected masks change (box and handles)
+        self._update_masks(prev_idx, self.selected_mask_idx)
 
     def mouseMoveEvent(self, event):
         if self.manual_mode:
             if self.dragging:
+                old = QRect(self.drag_start, self.drag_current).normalized()
                 self.drag_current = event.position().toPoint()
-                self.update()
+                new = QRect(self.drag_start, self.drag_current).normalized()
+                self._schedule_update(old.united(new).adjusted(-2, -2, 2, 2))
             return
 
         if self.selected_mask_idx is not None and self.edit_mode is not None:
@@ -737,15 +1243,13 @@ class TemplateCanvas(QWidget):
             dy = pos.y() - self.edit_start_pos.y()
             m = self.masks[self.selected_mask_idx]
             r = QRect(self.edit_start_rect)
+            # Repaint only where the mask was and where it ends up
+            old_dirty = self._mask_dirty_rect(self.selected_mask_idx)
             # --- Resize ---
             if self.edit_mode in ['nw', 'ne', 'sw', 'se', 'n', 's', 'e', 'w']:
                 # Convert display delta to image delta
-                iw, ih = self.image.width(), self.image.height()
-                disp_w, disp_h = self.display_pixmap.width(), self.display_pixmap.height()
-                sx = iw / disp_w
-                sy = ih / disp_h
-                ddx = int(dx * sx)
-                ddy = int(dy * sy)
+                ddx = int(dx * self._sx_img)
+                ddy = int(dy * self._sy_img)
                 if self.edit_mode == 'nw':
                     r.setTopLeft(r.topLeft() + QPoint(ddx, ddy))
                 elif self.edit_mode == 'ne':
@@ -766,37 +1270,36 @@ class TemplateCanvas(QWidget):
                 if r.width() < 20: r.setWidth(20)
                 if r.height() < 12: r.setHeight(12)
                 m.rect = r.normalized()
-                self.update()
             # --- Move ---
             elif self.edit_mode == 'move':
-                iw, ih = self.image.width(), self.image.height()
-                disp_w, disp_h = self.display_pixmap.width(), self.display_pixmap.height()
-                sx = iw / disp_w
-                sy = ih / disp_h
-                ddx = int(dx * sx)
-                ddy = int(dy * sy)
+                ddx = int(dx * self._sx_img)
+                ddy = int(dy * self._sy_img)
                 m.rect = QRect(r.x() + ddx, r.y() + ddy, r.width(), r.height())
-                self.update()
             # --- Rotate ---
             elif self.edit_mode == 'rotate':
-                # Calculate angle from center to mouse
-                x, y, w, h = qrect_to_tuple(r)
-                cx = x + w // 2
-                cy = y + h // 2
-                canvas_rect = self._canvas_rect()
-                disp_w, disp_h = self.display_pixmap.width(), self.display_pixmap.height()
-                sx = disp_w / self.image.width()
-                sy = disp_h / self.image.height()
-                center_disp = QPoint(int(canvas_rect.x() + cx * sx), int(canvas_rect.y() + cy * sy))
-                start_angle = self.edit_start_rotation
-                angle1 = np.arctan2(self.edit_start_pos.y() - center_disp.y(), self.edit_start_pos.x() - center_disp.x())
-                angle2 = np.arctan2(event.position().toPoint().y() - center_disp.y(), event.position().toPoint().x() - center_disp.x())
-                delta_deg = np.degrees(angle2 - angle1)
-                m.rotation = (start_angle + delta_deg) % 360
-                self.update()
+                # Angle from the mask center to the mouse, relative to the press
+                cx, cy = self._rotate_center
+                angle = math.atan2(pos.y() - cy, pos.x() - cx)
+                delta_deg = math.degrees(angle - self._rotate_start_angle)
+                m.rotation = (self.edit_start_rotation + delta_deg) % 360
+            self._update_mask_display_rect(self.selected_mask_idx)
+            self._schedule_update(old_dirty.united(self._mask_dirty_rect(self.selected_mask_idx)))
         self._last_cursor_pos = event.position().toPoint()
 
+    def _schedule_update(self, rect: QRect):
+        self._pending_dirty = self._pending_dirty.united(rect)
+        if not self._repaint_timer.isActive():
+            self._repaint_timer.start()
+
+    def _flush_update(self):
+        self._repaint_timer.stop()
+        if not self._pending_dirty.isEmpty():
+            self.update(self._pending_dirty)
+            self._pending_dirty = QRect()
+
     def mouseReleaseEvent(self, event):
+        # Paint whatever the last moves dirtied without waiting for the timer
+        self._flush_update()
         if self.manual_mode:
             if self.dragging:
                 end_pt = event.position().toPoint()
@@ -812,19 +1315,30 @@ class TemplateCanvas(QWidget):
                             # Select the newly added mask after manual masking
                             if hasattr(self, 'masks') and self.masks:
                                 self.selected_mask_idx = len(self.masks) - 1
-                                self.update()
+                                self._update_masks(self.selected_mask_idx)
+                if self.drag_start and self.drag_current:
+                    # Erase the rubber band
+                    self.update(QRect(self.drag_start, self.drag_current).normalized().adjusted(-2, -2, 2, 2))
                 self.drag_start = None
                 self.drag_current = None
-                self.update()
             return
 
-        # End interactive edit
+        # End interactive edit; the mask itself was already repainted while dragging
         self.edit_mode = None
         self.handle_type = None
         self.edit_start_pos = None
         self.edit_start_rect = None
         self.edit_start_rotation = None
-        self.update()
+        self._update_masks(self.selected_mask_idx)
+
+    def _update_masks(self, *indices: Optional[int]):
+        """Schedules a repaint of just the given masks (None entries are ignored)."""
+        dirty = QRect()
+        for idx in indices:
+            if idx is not None and idx < len(self._mask_display_rects):
+                dirty = dirty.united(self._mask_dirty_rect(idx))
+        if not dirty.isEmpty():
+            self.update(dirty)
 
     def _canvas_rect(self) -> QRect:
         # Center the pixmap
@@ -838,17 +1352,46 @@ class TemplateCanvas(QWidget):
     def _to_image_coords(self, p: QPoint) -> Optional[QPoint]:
         if self.image is None or self.display_pixmap is None:
             return None
-        canvas = self._canvas_rect()
-        if not canvas.contains(p):
+        if not self._canvas_rect_cached.contains(p):
             return None
-        iw, ih = self.image.width(), self.image.height()
-        disp_w, disp_h = self.display_pixmap.width(), self.display_pixmap.height()
-        sx = iw / disp_w
-        sy = ih / disp_h
-        ix = int((p.x() - canvas.x()) * sx)
-        iy = int((p.y() - canvas.y()) * sy)
-        return QPoint(ix, iy)
+        # Offset then scale, truncated: an inverted QTransform folds the offset into
+        # its translation and can land a hair below an integer, off by one pixel
+        o = self._canvas_origin
+        return QPoint(int((p.x() - o.x()) * self._sx_img), int((p.y() - o.y()) * self._sy_img))
+
+
+# -------------------------
+# Excel reading (off the UI thread)
+# -------------------------
+
+def read_excel(path: str) -> "pd.DataFrame":
+    import pandas as pd
+    ext = os.path.splitext(path)[-1].lower()
+    if ext not in (".xlsx", ".xls"):
+        raise ValueError("Unsupported Excel format")
+    # python-calamine (Rust) reads both formats much faster than openpyxl/xlrd
+    if importlib.util.find_spec("python_calamine") is not None:
+        return pd.read_excel(path, engine="calamine")
+    return pd.read_excel(path, engine="openpyxl" if ext == ".xlsx" else "xlrd")
+
+class _ExcelReadSignals(QObject):
+    finished = pyqtSignal(str, object)  # path, DataFrame
+    failed = pyqtSignal(str, str)       # path, error message
+
+class ExcelReadTask(QRunnable):
+    """Reads a workbook on a QThreadPool thread; results arrive on the UI thread via signals."""
+    def __init__(self, path: str):
+        super().__init__()
+        self.path = path
+        self.signals = _ExcelReadSignals()
 
+    def run(self):
+        try:
+            df = read_excel(self.path)
+        except Exception as e:
+            self.signals.failed.emit(self.path, str(e))
+        else:
+            self.signals.finished.emit(self.path, df)
 
 # -------------------------
 # Excel Preview Dialog (from provided snippet)
@@ -871,6 +1414,8 @@ class ExcelPreviewDialog(QDialog):
 
         self._orig_pixmap = pixmap
         self._scale = 1.0
+        self._drag_scaling = False  # fast scaling while the slider is held
+        self._last_render: Optional[Tuple[int, int, bool]] = None
 
         outer = QVBoxLayout(self)
 
@@ -900,6 +1445,8 @@ class ExcelPreviewDialog(QDialog):
 
         # Connections
         self.slider.valueChanged.connect(self._on_slider)
+        self.slider.sliderPressed.connect(self._on_slider_pressed)
+        self.slider.sliderReleased.connect(self._on_slider_released)
         self.image_label.clicked.connect(self._on_image_clicked)
         self.btn_back.clicked.connect(self._on_back)
         self.btn_continue.clicked.connect(self._on_continue)
@@ -911,6 +1458,13 @@ class ExcelPreviewDialog(QDialog):
         self._scale = v / 100.0
         self._render_scaled()
 
+    def _on_slider_pressed(self):
+        self._drag_scaling = True
+
+    def _on_slider_released(self):
+        self._drag_scaling = False
+        self._render_scaled()
+
     def _on_image_clicked(self):
         # toggle between fit (slider value) and 200% quick-zoom
         if abs(self._scale - 2.0) < 0.01:
@@ -926,7 +1480,19 @@ class ExcelPreviewDialog(QDialog):
             return
         sw = max(1, int(self._orig_pixmap.width() * self._scale))
         sh = max(1, int(self._orig_pixmap.height() * self._scale))
-        scaled = self._orig_pixmap.scaled(sw, sh, Qt.AspectRatioMode.KeepAspectRatio, Qt.TransformationMode.SmoothTransformation)
+        smooth = not self._drag_scaling
+        if self._last_render == (sw, sh, smooth):
+            return
+        self._last_render = (sw, sh, smooth)
+        if not smooth:
+            scaled = self._orig_pixmap.scaled(sw, sh, Qt.AspectRatioMode.KeepAspectRatio, Qt.TransformationMode.FastTransformation)
+        else:
+            # Smooth results are kept in QPixmapCache so revisiting a zoom level is free
+            key = f"preview:{self._orig_pixmap.cacheKey()}:{sw}x{sh}"
+            scaled = QPixmapCache.find(key)
+            if scaled is None:
+                scaled = self._orig_pixmap.scaled(sw, sh, Qt.AspectRatioMode.KeepAspectRatio, Qt.TransformationMode.SmoothTransformation)
+                QPixmapCache.insert(key, scaled)
         self.image_label.setPixmap(scaled)
 
     def _on_back(self):
@@ -941,33 +1507,87 @@ class ExcelPreviewDialog(QDialog):
     # were removed so they don't override the interactive behavior.
 
 # -------------------------
-# Generated certificates list (unchanged)
+# Generated certificates list
 # -------------------------
 
-class GeneratedItem(QWidget):
-    downloadClicked = pyqtSignal(int)  # index in list
+class GeneratedListModel(QAbstractListModel):
+    """
+    One row per generated certificate; the thumbnail is the decoration.
+    Thumbnails are made on demand when a row is painted, and only the most
+    recently shown ones are kept, so memory doesn't grow with the row count.
+    """
+    cached_thumbnails = 64  # a few screens' worth of rows
 
-    def __init__(self, index: int, pixmap: QPixmap):
-        super().__init__()
-        self.index = index
-        lay = QHBoxLayout(self)
-        lay.setContentsMargins(8, 8, 8, 8)
-        img_label = QLabel()
-        # Scale preview to a reasonable width, keep aspect ratio
-        target_w = 480
-        scaled = pixmap.scaledToWidth(target_w, Qt.TransformationMode.SmoothTransformation)
-        img_label.setPixmap(scaled)
-        btn = QPushButton("Download JPG")
-        btn.clicked.connect(self._dl)
-        lay.addWidget(img_label, 1)
-        lay.addWidget(btn)
-
-    def _dl(self):
-        self.downloadClicked.emit(self.index)
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self._count = 0
+        self._thumbnail: Optional[Callable[[int], QPixmap]] = None
+
+    def set_source(self, count: int, thumbnail: Optional[Callable[[int], QPixmap]]):
+        self.beginResetModel()
+        self._count = count
+        # A fresh cache per source; the list's own, so thumbnails don't compete
+        # with (or evict) other QPixmapCache users such as preview zoom levels
+        self._thumbnail = lru_cache(maxsize=self.cached_thumbnails)(thumbnail) if thumbnail else None
+        self.endResetModel()
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else self._count
+
+    def data(self, index, role=Qt.ItemDataRole.DisplayRole):
+        if not index.isValid() or role != Qt.ItemDataRole.DecorationRole:
+            return None
+        return self._thumbnail(index.row())
+
+class GeneratedItemDelegate(QStyledItemDelegate):
+    """Paints a thumbnail with a "Download JPG" button next to it.
+
+    Rows are painted on demand, so the list costs nothing per certificate
+    beyond its thumbnail, unlike one widget tree per row.
+    """
+    downloadClicked = pyqtSignal(int)  # row in list
+    margin = 8
+    button_text = "Download JPG"
+
+    def _button_rect(self, option) -> QRect:
+        fm = option.fontMetrics
+        size = QSize(fm.horizontalAdvance(self.button_text) + 24, fm.height() + 12)
+        area = option.rect.adjusted(self.margin, self.margin, -self.margin, -self.margin)
+        return QRect(area.right() - size.width() + 1,
+                     area.center().y() - size.height() // 2,
+                     size.width(), size.height())
+
+    def paint(self, painter, option, index):
+        pm = index.data(Qt.ItemDataRole.DecorationRole)
+        if pm is not None:
+            painter.drawPixmap(option.rect.left() + self.margin,
+                               option.rect.top() + self.margin, pm)
+        btn = QStyleOptionButton()
+        btn.rect = self._button_rect(option)
+        btn.text = self.button_text
+        btn.state = QStyle.StateFlag.State_Enabled | QStyle.StateFlag.State_Raised
+        style = option.widget.style() if option.widget else QApplication.style()
+        style.drawControl(QStyle.ControlElement.CE_PushButton, btn, painter, option.widget)
+
+    def sizeHint(self, option, index):
+        pm = index.data(Qt.ItemDataRole.DecorationRole)
+        h = pm.height() if pm is not None else 0
+        w = pm.width() if pm is not None else 0
+        btn = self._button_rect(option)
+        return QSize(w + btn.width() + 3 * self.margin, max(h, btn.height()) + 2 * self.margin)
+
+    def editorEvent(self, event, model, option, index):
+        if (event.type() == QEvent.Type.MouseButtonRelease
+                and event.button() == Qt.MouseButton.LeftButton
+                and self._button_rect(option).contains(event.position().toPoint())):
+            self.downloadClicked.emit(index.row())
+            return True
+        return False
 
 class GeneratedList(QWidget):
     downloadOne = pyqtSignal(int)
     downloadAll = pyqtSignal()
+    thumb_width = 480
 
     def __init__(self):
         super().__init__()
@@ -988,40 +1608,258 @@ class GeneratedList(QWidget):
         controls.addWidget(btn_all)
         outer.addLayout(controls)
 
-        self.scroll = QScrollArea()
-        self.scroll.setWidgetResizable(True)
-        self.inner = QWidget()
-        self.inner_layout = QVBoxLayout(self.inner)
-        self.inner_layout.setContentsMargins(8, 8, 8, 8)
-        self.scroll.setWidget(self.inner)
-        outer.addWidget(self.scroll, 1)
-        self._search_data = []
-
-    def populate(self, pixmaps: List[QPixmap], search_data: list = None):
-        # Clear
-        for i in reversed(range(self.inner_layout.count())):
-            w = self.inner_layout.itemAt(i).widget()
-            if w:
-                w.setParent(None)
-        # Add items
-        for idx, pm in enumerate(pixmaps):
-            item = GeneratedItem(idx, pm)
-            item.downloadClicked.connect(self.downloadOne.emit)
-            self.inner_layout.addWidget(item)
-        self.inner_layout.addStretch(1)
-        self._search_data = search_data if search_data else []
+        self.model = GeneratedListModel(self)
+        self.delegate = GeneratedItemDelegate(self)
+        self.delegate.downloadClicked.connect(self.downloadOne.emit)
+        self.view = QListView()
+        self.view.setModel(self.model)
+        self.view.setItemDelegate(self.delegate)
+        self.view.setSelectionMode(QListView.SelectionMode.NoSelection)
+        self.view.setVerticalScrollMode(QListView.ScrollMode.ScrollPerPixel)
+        # All thumbnails share one width and aspect ratio, so the view can
+        # size every row from the first one.
+        self.view.setUniformItemSizes(True)
+        outer.addWidget(self.view, 1)
+        # All rows' search keys joined by NUL (never typed into the search box),
+        # plus each row's start offset: one str.find scans every row in C
+        self._search_blob = ""
+        self._search_starts: List[int] = []
+
+    def populate(self, count: int, thumbnail: Optional[Callable[[int], QPixmap]],
+                 search_index: List[str] = None):
+        """
+        thumbnail(row) returns the row's preview, thumb_width wide.
+        search_index holds one string per row, as built by row_search_keys.
+        """
+        self.model.set_source(count, thumbnail)
+        search_index = search_index or []
+        self._search_blob = "\0".join(search_index)
+        self._search_starts = []
+        start = 0
+        for key in search_index:
+            self._search_starts.append(start)
+            start += len(key) + 1
 
     def _on_search(self):
         value = self.search_box.text().strip().lower()
-        if not value or not self._search_data:
+        if not value or not self._search_blob:
             return
-        for idx, row in enumerate(self._search_data):
-            if any(value in str(cell).lower() for cell in row):
-                # Scroll to the matching certificate
-                item_widget = self.inner_layout.itemAt(idx).widget()
-                if item_widget:
-                    self.scroll.ensureWidgetVisible(item_widget)
-                break
+        hit = self._search_blob.find(value)
+        if hit >= 0:
+            idx = bisect_right(self._search_starts, hit) - 1
+            # Scroll to the matching certificate
+            self.view.scrollTo(self.model.index(idx), QListView.ScrollHint.PositionAtTop)
+
+# -------------------------
+# Text fitting
+# -------------------------
+
+class MaskTextFitter:
+    """
+    Font fitting for one mask. The mask geometry and style are fixed for a whole
+    generation batch, so the fitted font and text position only depend on the
+    text and are memoized per string.
+    """
+    def __init__(self, m: MaskRegion, fonts: Optional[FontCache] = None):
+        """fonts is the font cache to measure with; the UI thread's styled_font by default."""
+        self.rect = QRect(m.rect)
+        self.style = m.style
+        r = self.rect
+        # Use more generous padding to prevent letter clipping (especially descenders)
+        self.padding = max(12, int(min(r.width(), r.height()) * 0.08))
+        self.avail_w = max(4, r.width() - (self.padding * 2))
+        self.avail_h = max(4, r.height() - (self.padding * 2))
+        # Text-independent parts of the position and clamp bounds
+        self._center_x = r.x() + r.width() // 2
+        self._center_y = r.y() + r.height() // 2
+        self._inner_left = r.x() + self.padding
+        self._inner_right = r.x() + r.width() - self.padding
+        self._inner_top = r.y() + self.padding
+        self._inner_bottom = r.y() + r.height() - self.padding
+        self.fit = lru_cache(maxsize=4096)(self._fit)
+        # Columns often repeat values (course, date, ...): those rows share one
+        # pre-rendered tile, so composing them is a plain image blit
+        self.render = lru_cache(maxsize=256)(self._render)
+
+        style = self.style
+        # Sized fonts and their metrics come from the font cache, which keeps them
+        # across texts and masks sharing it; the search visits the same sizes for every text
+        self._fonts = fonts if fonts is not None else styled_font
+        flags = (style.bold, style.italic, style.underline)
+        # Metrics used to test if full text can fit with reasonable font size.
+        # This test font does not carry the user's family.
+        self._test_fm = self._fonts("", max(12, int(self.avail_h * 0.3)), *flags)[1]  # Minimum readable size
+        # The user's family applies to fitting, so the search measures the real font
+        self._font_args = (getattr(style, 'family', '') or "",) + flags
+
+        # Use variable style color if provided; resolved once for every tile
+        self._pen = QPen(style.color if hasattr(style, 'color') else QColor(10, 10, 10))
+
+    def _font_at(self, size: int) -> Tuple[QFont, QFontMetrics]:
+        family, bold, italic, underline = self._font_args
+        return self._fonts(family, size, bold, italic, underline)
+
+    def _fit(self, original_text: str) -> Tuple[str, QFont, QFontMetrics, QRect, int, int]:
+        """Returns (text to draw, font, its metrics, text bounding rect, baseline x, baseline y) for original_text."""
+        style = self.style
+        avail_w, avail_h = self.avail_w, self.avail_h
+
+        # Smart word trimming based on region size
+        text = original_text.strip()
+        words = text.split()
+
+        # Only apply 3-word rule if region is too small AND text is long
+        if len(words) >= 3 and self._test_fm.horizontalAdvance(original_text) > avail_w * 1.5:
+            # Region is small and text is long, trim to 2 words (split() leaves
+            # no whitespace to strip)
+            text = " ".join(words[:2])
+        # Otherwise use full text
+
+        user_size = getattr(style, 'size', None)
+        if user_size and user_size > 0:
+            # Use exactly the user-selected size for consistent appearance across
+            # masks; explicit sizes are never shrunk, even if they overflow
+            f, fm_final = self._font_at(int(user_size))
+            text_rect = fm_final.boundingRect(text)
+        else:
+            # --- Enhanced Auto font scaling ---
+            max_size = min(int(avail_h * 0.8), 120)  # Don't exceed 80% of height or 120pt
+            min_size = 8
+
+            # Binary search for the largest size whose boundingRect width and
+            # full line height (ascenders and descenders) fit
+            low, high = min_size, max_size
+            best_size, text_rect = min_size, None
+            while low <= high:
+                mid_size = (low + high) // 2
+                fm = self._font_at(mid_size)[1]
+                mid_rect = fm.boundingRect(text)
+                if mid_rect.width() <= avail_w and fm.height() <= avail_h:
+                    best_size, text_rect = mid_size, mid_rect
+                    low = mid_size + 1
+                else:
+                    high = mid_size - 1
+            f, fm_final = self._font_at(best_size)
+            if text_rect is None:
+                # Nothing fits; min_size is the floor
+                text_rect = fm_final.boundingRect(text)
+            final_w = text_rect.width()
+
+            # Handle case where text is much smaller than available space
+            # If the region is significantly larger than needed, don't make font too small
+            if final_w < avail_w * 0.6 and fm_final.height() < avail_h * 0.6 and best_size < 16:
+                # Try to increase font size for better visibility
+                larger_f, fm_test = self._font_at(min(24, int(avail_h * 0.7)))
+                larger_rect = fm_test.boundingRect(text)
+                if larger_rect.width() <= avail_w and fm_test.height() <= avail_h:
+                    # Use the larger size
+                    f, fm_final, text_rect = larger_f, fm_test, larger_rect
+
+        # Calculate text position: always center horizontally and vertically.
+        # text_rect was measured at the final size above; text layout is the
+        # expensive part here, so it isn't measured again.
+        text_w = text_rect.width()
+        ascent, descent = fm_final.ascent(), fm_final.descent()
+
+        text_x = self._center_x - text_w // 2
+        # Vertical baseline: center and adjust by ascent/descent
+        text_y = self._center_y + (ascent - descent) // 2
+
+        # Clamp inside region with padding (upper bound first, so the left/top
+        # edge wins when the text is larger than the region)
+        max_x = self._inner_right - text_w
+        text_x = max_x if text_x > max_x else text_x
+        text_x = self._inner_left if text_x < self._inner_left else text_x
+
+        max_y = self._inner_bottom - descent
+        text_y = max_y if text_y > max_y else text_y
+        min_y = self._inner_top + ascent
+        text_y = min_y if text_y < min_y else text_y
+
+        return text, f, fm_final, text_rect, text_x, text_y
+
+    def _render(self, original_text: str) -> Optional[Tuple[QPoint, QImage]]:
+        """
+        Draws the fitted text into a transparent tile covering just the text.
+        Returns (top-left in image coordinates, tile), or None for empty text.
+        Tiles are shared between rows and must not be painted on.
+        """
+        if not original_text:
+            return None
+        text, f, fm, text_rect, text_x, text_y = self.fit(original_text)
+        # Generous margin for italic overhang and antialiasing outside boundingRect
+        margin = max(4, fm.height() // 2)
+        area = text_rect.translated(text_x, text_y).adjusted(-margin, -margin, margin, margin)
+        tile = QImage(area.size(), QImage.Format.Format_ARGB32_Premultiplied)
+        tile.fill(Qt.GlobalColor.transparent)
+        painter = QPainter(tile)
+        painter.setRenderHint(QPainter.RenderHint.TextAntialiasing, True)
+        painter.setFont(f)
+        painter.setPen(self._pen)
+        painter.drawText(text_x - area.x(), text_y - area.y(), text)
+        painter.end()
+        return area.topLeft(), tile
+
+def compose_text_layer(base: Union[QImage, QPixmap], layer: List[Tuple[QPoint, QImage]],
+                       scale: float = 1.0) -> Union[QImage, QPixmap]:
+    """Copy of base with the text tiles of one certificate drawn on top (tiles are in
+    original image coordinates; scale maps them onto a resized base)."""
+    out = base.copy()
+    painter = QPainter(out)
+    if scale != 1.0:
+        painter.setRenderHint(QPainter.RenderHint.SmoothPixmapTransform, True)
+        painter.scale(scale, scale)
+    for pos, tile in layer:
+        painter.drawImage(pos, tile)
+    painter.end()
+    return out
+
+class _RenderTilesSignals(QObject):
+    finished = pyqtSignal(int, object)  # task index, tiles in the order of its texts
+    failed = pyqtSignal(int, str)       # task index, error message
+
+class RenderTilesTask(QRunnable):
+    """
+    Renders the tiles of one mask for a chunk of its distinct values on a QThreadPool
+    thread; results arrive on the UI thread via signals. The fitter and its font
+    cache are built in run(), so they are confined to the pool thread.
+    """
+    def __init__(self, index: int, mask: "MaskRegion", texts: List[str]):
+        super().__init__()
+        self.index = index
+        self.mask = mask
+        self.texts = texts
+        self.signals = _RenderTilesSignals()
+        self.cancelled = False  # set from the UI thread once another task failed
+
+    def run(self):
+        if self.cancelled:
+            return
+        try:
+            render = MaskTextFitter(self.mask, new_font_cache()).render
+            tiles = [render(t) for t in self.texts]
+        except Exception as e:
+            self.signals.failed.emit(self.index, str(e))
+            return
+        self.signals.finished.emit(self.index, tiles)
+
+def cell_text(df: "pd.DataFrame") -> "pd.DataFrame":
+    """The frame with every cell as its display text and missing cells as "", in one vectorized pass."""
+    # Object dtype keeps str() of each value, e.g. for timestamps
+    values = df.astype(object)
+    return values.where(values.notna(), "").map(str)
+
+def row_search_keys(text: "pd.DataFrame") -> List[str]:
+    """
+    Per row of a cell_text frame, the lowercased text of all its cells joined
+    with NUL. NUL can't be typed in the search box, so a query never matches
+    across two cells. Lowercasing runs a column at a time; only the join is
+    per row. (Pandas' own string concatenation would drop the NULs.)
+    """
+    if text.shape[1] == 0:
+        return [""] * len(text)
+    cols = [text.iloc[:, i].str.lower().tolist() for i in range(text.shape[1])]
+    return ["\0".join(cells) for cells in zip(*cols)]
 
 # -------------------------
 # Main Window
@@ -1031,6 +1869,8 @@ class MainWindow(QMainWindow):
     def __init__(self):
         super().__init__()
         self.setWindowTitle("Certificate Mass Production Tool")
+        # Room for a batch of generated thumbnails and preview zoom levels (KB)
+        QPixmapCache.setCacheLimit(65536)
         # Show maximized with title bar, but disable resize/minimize/maximize
         # Keep close button visible so top-right controls remain present.
         self.setWindowFlags(
@@ -1049,10 +1889,33 @@ class MainWindow(QMainWindow):
         self.template_path: Optional[str] = None
         self.template_img: Optional[QImage] = None
         self.masks: List[MaskRegion] = []
+        self.mask_by_letter: Dict[str, MaskRegion] = {}  # kept in step with self.masks
+        # label_text (Excel column name) -> letter; None until needed again after
+        # masks or labels change (see _label_letters)
+        self._label_to_letter: Optional[Dict[str, str]] = None
+        self._excel_task: Optional[ExcelReadTask] = None
+        # Exported certificates; 90 keeps text crisp at about half the encode time of 95
+        self.jpeg_quality = 90
         self.assignments: Dict[str, str] = {}  # letter -> label string
         self.styles: Dict[str, TextStyle] = {}
-        self.generated_images: List[QImage] = []  # original-size images
-        self.generated_pixmaps: List[QPixmap] = []
+        # Label edits reach the canvas at most every 50 ms, however fast the typing
+        self._pending_edits: Dict[str, str] = {}
+        self._edit_debounce = QTimer(self)
+        self._edit_debounce.setSingleShot(True)
+        self._edit_debounce.setInterval(50)
+        self._edit_debounce.timeout.connect(self._flush_edits)
+        # Per certificate: text tiles (image coordinates) and a thumbnail preview.
+        # Full-size images are composed from the template only when exported.
+        self.generated_layers: List[List[Tuple[QPoint, QImage]]] = []
+        self.render_batch_values = 64  # distinct values of one mask per RenderTilesTask
+        # True while generation or export pumps the event loop; drops are refused meanwhile
+        self._busy = False
+        # Template scaled for thumbnails, keyed by (template cacheKey, width); backgrounds
+        # never change between rows or between runs on the same template
+        self._thumb_bg: Optional[Tuple[Tuple[int, int], QPixmap]] = None
+        # Detected regions per template file, keyed by (path, size, mtime_ns), so
+        # dropping an unchanged file again skips detection
+        self._detect_cache: Dict[Tuple[str, int, int], List[Tuple[int, int, int, int]]] = {}
 
         self._letters_iter = iter(string.ascii_lowercase)
 
@@ -1129,18 +1992,21 @@ class MainWindow(QMainWindow):
 
     # ----------------- Template handling -----------------
     def on_template_dropped(self, path: str):
+        if self._busy:
+            return
         img = load_qimage(path)
         if img is None:
             QMessageBox.critical(self, "Error", "Failed to load image.")
             return
         self.reset_generated_outputs()
+        self._pending_edits.clear()
         self.template_path = path
         self.template_img = img
         self.template_canvas.set_image(self.template_img)
         self.btn_manual.setEnabled(True)
 
         # Auto-detect empty spaces / gaps
-        rects = detect_blank_regions_cv(path)
+        rects = self._detect_regions(path, img)
         self.masks = []
         self._letters_iter = iter(string.ascii_lowercase)
         for r in rects:
@@ -1148,6 +2014,8 @@ class MainWindow(QMainWindow):
             if letter is None:
                 break
             self.masks.append(MaskRegion(letter=letter, rect=r))
+        self.mask_by_letter = {m.letter: m for m in self.masks}
+        self._label_to_letter = None
 
         self.assignments = {m.letter: m.label_text for m in self.masks}
         self.styles = {m.letter: m.style for m in self.masks}
@@ -1158,6 +2026,18 @@ class MainWindow(QMainWindow):
         self.template_canvas.set_styles(self.styles)
         self.show_template_preview()
 
+    def _detect_regions(self, path: str, img: QImage) -> List[QRect]:
+        try:
+            st = os.stat(path)
+            key = (os.path.realpath(path), st.st_size, st.st_mtime_ns)
+        except OSError:
+            return detect_blank_regions_cv(img)
+        found = self._detect_cache.get(key)
+        if found is None:
+            found = self._detect_cache[key] = [qrect_to_tuple(r) for r in detect_blank_regions_cv(img)]
+        # Fresh QRects every time; masks take ownership of theirs
+        return [QRect(*t) for t in found]
+
     def on_mask_added(self, rect_in_image: QRect):
         # Add a new variable letter
         letter = next(self._letters_iter, None)
@@ -1166,6 +2046,8 @@ class MainWindow(QMainWindow):
             return
         m = MaskRegion(letter=letter, rect=rect_in_image)
         self.masks.append(m)
+        self.mask_by_letter[m.letter] = m
+        self._label_to_letter = None
         self.assignments[m.letter] = ""
         self.styles[m.letter] = TextStyle()
         self.var_panel.set_variables(self.masks)
@@ -1180,7 +2062,7 @@ class MainWindow(QMainWindow):
         else:
             # Ensure canvas is not in manual mode even if button was already off
             self.template_canvas.set_manual_mode(False)
-        self.template_canvas.update()  # Ensure the canvas updates with new handles and buttons
+        # set_masks above already scheduled a full repaint, which shows the new selection
 
     def on_manual_toggled(self, checked: bool):
         self.template_canvas.set_manual_mode(checked)
@@ -1191,24 +2073,32 @@ class MainWindow(QMainWindow):
             self.statusBar().showMessage("Manual Masking: OFF", 3000)
 
     def on_assignment_changed(self, letter: str, text: str):
-        for m in self.masks:
-            if m.letter == letter:
-                m.label_text = text
-                break
+        m = self.mask_by_letter.get(letter)
+        if m is not None:
+            m.label_text = text
+            self._label_to_letter = None
         self.assignments[letter] = text
-        self.template_canvas.set_assignments(self.assignments)
+        self._pending_edits[letter] = text
+        self._edit_debounce.start()
+
+    def _flush_edits(self):
+        pending, self._pending_edits = self._pending_edits, {}
+        for letter, text in pending.items():
+            if letter in self.mask_by_letter:  # skip variables deleted meanwhile
+                self.template_canvas.update_assignment(letter, text)
 
     def on_style_changed(self, letter: str, style: TextStyle):
-        for m in self.masks:
-            if m.letter == letter:
-                m.style = style
-                break
+        m = self.mask_by_letter.get(letter)
+        if m is not None:
+            m.style = style
         self.styles[letter] = style
-        self.template_canvas.set_styles(self.styles)
+        self.template_canvas.update_style(letter, style)
 
     def on_delete_variable(self, letter: str):   # NEW METHOD
         # Remove from masks, assignments, and styles
         self.masks = [m for m in self.masks if m.letter != letter]
+        self.mask_by_letter.pop(letter, None)
+        self._label_to_letter = None
         if letter in self.assignments:
             del self.assignments[letter]
         if letter in self.styles:
@@ -1224,17 +2114,33 @@ class MainWindow(QMainWindow):
             self.template_canvas.selected_mask_idx = len(self.masks) - 1
         else:
             self.template_canvas.selected_mask_idx = None
-        self.template_canvas.update()  # Ensure the canvas updates after deletion
+        # set_masks above already scheduled a full repaint, which shows the new selection
 
     # ----------------- Excel handling -----------------
     def on_excel_dropped(self, path: str):
         if not self.template_img or not self.masks:
             QMessageBox.warning(self, "Info", "Please drop a certificate template and set masks first.")
             return
-        try:
-            df = self._read_excel(path)
-        except Exception as e:
-            QMessageBox.critical(self, "Error", f"Failed to read Excel: {e}")
+        if self._excel_task is not None or self._busy:
+            return  # a workbook is already being read or certificates are being generated
+        # Read the workbook in the background; the UI stays responsive meanwhile
+        task = ExcelReadTask(path)
+        task.signals.finished.connect(self.on_excel_read)
+        task.signals.failed.connect(self.on_excel_read_failed)
+        self._excel_task = task  # keeps the signals object alive until delivery
+        self.statusBar().showMessage("Reading Excel...")
+        QThreadPool.globalInstance().start(task)
+
+    def on_excel_read_failed(self, path: str, error: str):
+        self._excel_task = None
+        self.statusBar().clearMessage()
+        QMessageBox.critical(self, "Error", f"Failed to read Excel: {error}")
+
+    def on_excel_read(self, path: str, df: "pd.DataFrame"):
+        self._excel_task = None
+        self.statusBar().clearMessage()
+        if not self.template_img or not self.masks:
+            # Template was cleared while the workbook was being read
             return
 
         # Validation 1: number of columns equals number of masked variables
@@ -1256,22 +2162,14 @@ class MainWindow(QMainWindow):
 
         # Passed validation: show a sample preview dialog (first row) for confirmation
         try:
-            # Map label_text (column names) -> letter
-            label_to_letter = {m.label_text: m.letter for m in self.masks}
-
             if df.shape[0] == 0:
                 # No rows to preview; proceed as before
-                self.generate_certificates(df)
-                self.show_generated_list()
+                if self.generate_certificates(df):
+                    self.show_generated_list()
                 return
 
             # Build sample values from first row
-            first_row = df.iloc[0]
-            values_by_letter = {}
-            for col_name, value in first_row.items():
-                letter = label_to_letter.get(str(col_name))
-                if letter:
-                    values_by_letter[letter] = "" if pd.isna(value) else str(value)
+            values_by_letter = self._values_by_letter(cell_text(df.head(1)))[0]
 
             sample_img = self._draw_text_on_image(self.template_img, values_by_letter)
             sample_pix = QPixmap.fromImage(sample_img)
@@ -1280,8 +2178,8 @@ class MainWindow(QMainWindow):
             res = dlg.exec()
             if res == QDialog.DialogCode.Accepted:
                 # Continue: generate all certificates and show list
-                self.generate_certificates(df)
-                self.show_generated_list()
+                if self.generate_certificates(df):
+                    self.show_generated_list()
             else:
                 # Go back and allow manual editing
                 self.show_template_preview()
@@ -1293,230 +2191,232 @@ class MainWindow(QMainWindow):
         except Exception as e:
             QMessageBox.critical(self, "Error", f"Failed to generate certificates: {e}")
 
-    def _read_excel(self, path: str) -> pd.DataFrame:
-        ext = os.path.splitext(path)[-1].lower()
-        if ext == ".xlsx":
-            return pd.read_excel(path, engine="openpyxl")
-        elif ext == ".xls":
-            return pd.read_excel(path, engine="xlrd")
-        else:
-            raise ValueError("Unsupported Excel format")
-
     # ----------------- Generation & Export -----------------
 
-    def _draw_text_on_image(self, base: QImage, values_by_letter: Dict[str, str]) -> QImage:
+    def _draw_text_on_image(self, base: QImage, values_by_letter: Dict[str, str],
+                            fitters: Optional[List[Tuple[str, Callable]]] = None) -> QImage:
         """
         Draws per-mask text with per-variable styles on a copy of the original-size image.
         Ensures text auto-scales to fit inside the mask (both width and height).
         Handles small text in large regions and large text in small regions intelligently.
+        Pass `fitters` (see _make_fitters) to share font fitting across a batch.
         """
-        out = QImage(base)  # copy
-        painter = QPainter(out)
-        painter.setRenderHint(QPainter.RenderHint.TextAntialiasing, True)
-
-        for m in self.masks:
-            original_text = values_by_letter.get(m.letter, "")
-            if not original_text:
-                continue
-            r = m.rect
-
-            # Smart word trimming based on region size
-            words = original_text.strip().split()
-            text = original_text.strip()
-            
-            # Create a test font to measure if full text can fit
-            test_font = QFont()
-            test_font.setBold(m.style.bold)
-            test_font.setItalic(m.style.italic)
-            test_font.setUnderline(m.style.underline)
-            
-            # Use more generous padding to prevent letter clipping (especially descenders)
-            padding = max(12, int(min(r.width(), r.height()) * 0.08))
-            avail_w = max(4, r.width() - (padding * 2))
-            avail_h = max(4, r.height() - (padding * 2))
-            
-            # Test if full text can fit with reasonable font size
-            min_reasonable_size = max(12, int(avail_h * 0.3))  # Minimum readable size
-            test_font.setPointSize(min_reasonable_size)
-            test_fm = QFontMetrics(test_font)
-            full_text_width = test_fm.horizontalAdvance(original_text)
-            
-            # Only apply 3-word rule if region is too small AND text is long
-            if len(words) >= 3 and full_text_width > avail_w * 1.5:
-                # Region is small and text is long, trim to 2 words
-                text = " ".join(words[:2]).strip()
-            # Otherwise use full text
-                
-            # Start with a font size that accounts for descenders
-            f = QFont()
-            f.setBold(m.style.bold)
-            f.setItalic(m.style.italic)
-            f.setUnderline(m.style.underline)
-            
-            # Better initial size estimation
-            char_width_estimate = avail_w / max(1, len(text)) if text else 1
-            height_based_size = int(avail_h * 0.6)  # Leave more room for descenders
-            width_based_size = int(char_width_estimate * 1.2)
-            initial_size = min(height_based_size, width_based_size, 72)  # Cap at 72pt
-            initial_size = max(initial_size, 8)  # Minimum 8pt
-
-            # --- Enhanced Auto font scaling ---
-            max_size = min(int(avail_h * 0.8), 120)  # Don't exceed 80% of height or 120pt
-            min_size = 8
-            fitted_size = min_size
-
-            # Binary search for optimal font size
-            low, high = min_size, max_size
-            best_size = min_size
-            
-            while low <= high:
-                mid_size = (low + high) // 2
-                f.setPointSize(mid_size)
-                fm = QFontMetrics(f)
-                
-                # Use boundingRect for more accurate measurements including descenders
-                text_rect = fm.boundingRect(text)
-                text_w = text_rect.width()
-                text_h = fm.height()  # Total height including ascenders and descenders
-                
-                if text_w <= avail_w and text_h <= avail_h:
-                    best_size = mid_size
-                    low = mid_size + 1
-                else:
-                    high = mid_size - 1
-            
-            fitted_size = best_size
-            f.setPointSize(fitted_size)
-
-            # If user specified an explicit size/family, prefer it but avoid vertical clipping only
-            user_size = getattr(m.style, 'size', None)
-            user_family = getattr(m.style, 'family', '')
-            if user_family:
-                f.setFamily(user_family)
-            user_explicit = bool(user_size and user_size > 0)
-            if user_explicit:
-                # Use exactly the user-selected size for consistent appearance across masks
-                f.setPointSize(int(user_size))
-                fm_final = QFontMetrics(f)
-            else:
-                # No explicit user size; use auto-calculated fm_final
-                fm_final = QFontMetrics(f)
-
-            # Final verification and adjustment
-            fm_final = QFontMetrics(f)
-            final_rect = fm_final.boundingRect(text)
-            final_w = final_rect.width()
-            final_h = fm_final.height()
-            
-            # If still too tall (or too wide when auto-fit), make small adjustments
-            shrink_attempts = 0
-            def needs_shrink():
-                if user_explicit:
-                    # Do not shrink explicit sizes at all; keep the same size even if it overflows
-                    return False
-                else:
-                    return (final_w > avail_w or final_h > avail_h)
-            while needs_shrink() and f.pointSize() > min_size and shrink_attempts < 10:
-                new_size = max(min_size, f.pointSize() - 1)
-                f.setPointSize(new_size)
-                fm_final = QFontMetrics(f)
-                final_rect = fm_final.boundingRect(text)
-                final_w = final_rect.width()
-                final_h = fm_final.height()
-                shrink_attempts += 1
-
-            # Handle case where text is much smaller than available space
-            # If the region is significantly larger than needed, don't make font too small
-            if (not user_explicit) and final_w < avail_w * 0.6 and final_h < avail_h * 0.6 and f.pointSize() < 16:
-                # Try to increase font size for better visibility
-                larger_size = min(24, int(avail_h * 0.7))
-                f.setPointSize(larger_size)
-                fm_test = QFontMetrics(f)
-                test_rect = fm_test.boundingRect(text)
-                if test_rect.width() <= avail_w and fm_test.height() <= avail_h:
-                    # Use the larger size
-                    fm_final = fm_test
-                else:
-                    # Revert to previous size
-                    f.setPointSize(fitted_size)
-                    fm_final = QFontMetrics(f)
-
-            painter.setFont(f)
-            # Use variable style color if provided
-            pen_color = m.style.color if hasattr(m.style, 'color') else QColor(10, 10, 10)
-            painter.setPen(pen_color)
-
-            # Calculate text position: always center horizontally and vertically
-            text_rect = fm_final.boundingRect(text)
-            center_x = r.x() + r.width() // 2
-            center_y = r.y() + r.height() // 2
-
-            text_x = center_x - text_rect.width() // 2
-            # Vertical baseline: center and adjust by ascent/descent
-            text_y = center_y + (fm_final.ascent() - fm_final.descent()) // 2
-
-            # Clamp inside region with padding
-            min_x = r.x() + padding
-            max_x = r.x() + r.width() - text_rect.width() - padding
-            text_x = max(min_x, min(text_x, max_x))
-
-            min_y = r.y() + fm_final.ascent() + padding
-            max_y = r.y() + r.height() - fm_final.descent() - padding
-            text_y = max(min_y, min(text_y, max_y))
-
-            painter.drawText(text_x, text_y, text)
-
-        painter.end()  # End painter after all text has been drawn
-        return out
-
-    def generate_certificates(self, df: pd.DataFrame):
-        # Map label_text (column names) -> letter
-        label_to_letter = {m.label_text: m.letter for m in self.masks}
-        self.generated_images.clear()
-        self.generated_pixmaps.clear()
-        self.excel_data_rows = df.values.tolist()  # Save for search
-        for idx, row in df.iterrows():
-            values_by_letter = {}
-            for col_name, value in row.items():
-                letter = label_to_letter.get(str(col_name))
-                if letter:
-                    values_by_letter[letter] = "" if pd.isna(value) else str(value)
-            final = self._draw_text_on_image(self.template_img, values_by_letter)
-            self.generated_images.append(final)
-            self.generated_pixmaps.append(QPixmap.fromImage(final))
+        return compose_text_layer(base, self._render_text_layer(values_by_letter, fitters))
+
+    def _render_text_layer(self, values_by_letter: Dict[str, str],
+                           fitters: Optional[List[Tuple[str, Callable]]] = None) -> List[Tuple[QPoint, QImage]]:
+        """Text tiles of one certificate, without touching the template pixels."""
+        if fitters is None:
+            fitters = self._make_fitters()
+        get = values_by_letter.get
+        layer = []
+        for letter, render in fitters:
+            tile = render(get(letter, ""))
+            if tile is not None:
+                layer.append(tile)
+        return layer
+
+    def _make_fitters(self) -> List[Tuple[str, Callable]]:
+        """
+        Per mask, in mask order: its letter and its fitter's render. Resolved
+        once per batch so rows don't go through mask objects or dict lookups.
+        UI thread only: the fitters use the shared styled_font cache.
+        """
+        return [(m.letter, MaskTextFitter(m).render) for m in self.masks]
+
+    def _label_letters(self) -> Dict[str, str]:
+        """Map label_text (column names) -> letter, rebuilt only after masks or labels change."""
+        if self._label_to_letter is None:
+            self._label_to_letter = {m.label_text: m.letter for m in self.masks}
+        return self._label_to_letter
+
+    def _values_by_letter(self, text: "pd.DataFrame") -> List[Dict[str, str]]:
+        """Per row of a cell_text frame, the cell text keyed by the letter of the mask its column maps to."""
+        label_to_letter = self._label_letters()
+        cols = [i for i, c in enumerate(text.columns) if str(c) in label_to_letter]
+        letters = [label_to_letter[str(text.columns[i])] for i in cols]
+        return [dict(zip(letters, row)) for row in text.iloc[:, cols].itertuples(index=False, name=None)]
+
+    def generate_certificates(self, df: "pd.DataFrame") -> bool:
+        """Renders the text layers of every row; False if cancelled or already running."""
+        if self._busy:
+            return False  # called again from the event loop of a run in progress
+        self.generated_layers.clear()
+        # Cells are stringified once, for both the search index and rendering
+        text = cell_text(df)
+        self.excel_search_keys = row_search_keys(text)  # Save for search
+        rows = self._values_by_letter(text)
+
+        # Only the text is rendered here, as small tiles; copying the full-size
+        # template per row is left to export. A tile depends only on its mask and
+        # value, so each mask fits and renders every distinct value of its column
+        # once per run, and rows then share those read-only tiles. Painting on a
+        # QImage is safe off the GUI thread and PyQt releases the GIL inside Qt
+        # calls, so chunks of values are rendered on the global QThreadPool; the
+        # UI thread keeps processing events (progress, repaints) until all are in.
+        # Tasks get a snapshot of their mask and build their own fitter, so no
+        # fitter, font or cache is shared between threads.
+        masks = [replace(m, rect=QRect(m.rect), style=replace(m.style, color=QColor(m.style.color)))
+                 for m in self.masks]
+        step = self.render_batch_values
+        jobs: List[Tuple[int, List[str]]] = []  # (mask index, chunk of its distinct values)
+        for mi, m in enumerate(masks):
+            values = list(dict.fromkeys(v.get(m.letter, "") for v in rows))
+            jobs.extend((mi, values[i:i + step]) for i in range(0, len(values), step))
+        tasks = [RenderTilesTask(n, masks[mi], texts) for n, (mi, texts) in enumerate(jobs)]
+        done: Dict[int, list] = {}
+        errors: List[str] = []
+        # The modal dialog is shown right away, before the loop below starts
+        # delivering events, so the window takes no input while tasks run.
+        # Cancel (or Esc / closing it) stops the run; see the loop below.
+        progress = QProgressDialog("Generating certificates...", "Cancel", 0, len(tasks), self)
+        progress.setWindowModality(Qt.WindowModality.WindowModal)
+        progress.setMinimumDuration(0)
+        progress.setValue(0)
+        pool = QThreadPool.globalInstance()
+        self._busy = True
+        try:
+            for task in tasks:
+                task.signals.finished.connect(done.__setitem__)
+                task.signals.failed.connect(lambda n, msg: errors.append(msg))
+                pool.start(task)
+            while len(done) < len(tasks) and not errors and not progress.wasCanceled():
+                QApplication.processEvents(QEventLoop.ProcessEventsFlag.WaitForMoreEvents)
+                progress.setValue(len(done))
+        finally:
+            self._busy = False
+            progress.close()
+        if len(done) < len(tasks):
+            # Failed or cancelled: tasks not started yet are skipped, and the
+            # results of those still running are dropped with `done`
+            for task in tasks:
+                task.cancelled = True
+            if errors:
+                raise RuntimeError(errors[0])  # reported by the caller
+            return False
+        tiles: List[Dict[str, Optional[Tuple[QPoint, QImage]]]] = [{} for _ in masks]
+        for n, (mi, texts) in enumerate(jobs):
+            tiles[mi].update(zip(texts, done[n]))
+        for v in rows:
+            layer = []
+            for m, by_text in zip(masks, tiles):
+                tile = by_text[v.get(m.letter, "")]
+                if tile is not None:
+                    layer.append(tile)
+            self.generated_layers.append(layer)
+        return True
+
+    def _thumbnail(self, index: int) -> QPixmap:
+        """List preview of one certificate, composed at thumbnail size on a once-scaled template."""
+        thumb_w = GeneratedList.thumb_width
+        scale = thumb_w / self.template_img.width()
+        # Painting straight onto a pixmap copy skips a QImage -> QPixmap conversion per row
+        return compose_text_layer(self._thumb_background(thumb_w), self.generated_layers[index], scale)
+
+    def _thumb_background(self, width: int) -> QPixmap:
+        """The template scaled to thumbnail width, kept until the template changes."""
+        key = (self.template_img.cacheKey(), width)
+        if self._thumb_bg is None or self._thumb_bg[0] != key:
+            scaled = self.template_img.scaledToWidth(width, Qt.TransformationMode.SmoothTransformation)
+            self._thumb_bg = (key, QPixmap.fromImage(scaled))
+        return self._thumb_bg[1]
+
+    def _render_certificate(self, index: int) -> QImage:
+        """Full-size certificate for export."""
+        return compose_text_layer(self.template_img, self.generated_layers[index])
 
     def on_download_one(self, index: int):
-        if index < 0 or index >= len(self.generated_images):
+        if index < 0 or index >= len(self.generated_layers):
             return
         default_name = f"certificate_{index+1:03d}.jpg"
         path, _ = QFileDialog.getSaveFileName(self, "Save Certificate", default_name, "JPEG Image (*.jpg)")
         if path:
-            self._save_qimage_jpg(self.generated_images[index], path)
+            self._save_qimage_jpg(self._render_certificate(index), path)
 
     def on_download_all(self):
         directory = QFileDialog.getExistingDirectory(self, "Select Folder to Save All")
         if not directory:
             return
-        for i, img in enumerate(self.generated_images, start=1):
-            fname = os.path.join(directory, f"certificate_{i:03d}.jpg")
-            self._save_qimage_jpg(img, fname)
+        self._save_all_to(directory)
         QMessageBox.information(self, "Done", "All certificates saved.")
 
+    def _save_all_to(self, directory: str):
+        # One full-size copy of the template is reused for every certificate:
+        # draw a row's tiles, save, then restore just the tile areas from the
+        # template. With libjpeg-turbo or Pillow, the snapshot taken for the
+        # encoder is JPEG-encoded on a thread pool while the next row is drawn.
+        use_fast = has_fast_jpeg()
+        # Opaque templates (the usual case) are worked on as RGB32: Qt paints it
+        # natively, the restores are plain copies, and the encoders read it as
+        # BGRX without an RGBA -> RGB pass. Converted once, not per row.
+        base = self.template_img
+        if is_opaque(base):
+            base = base.convertToFormat(QImage.Format.Format_RGB32)
+        scratch = base.copy()
+        # Encoder backlog is bounded: each queued snapshot is a full-size copy,
+        # so drawing waits for the oldest encode once this many are in flight
+        workers = os.cpu_count() or 1
+        max_pending = 2 * workers
+        pending = deque()
+        failed = []
+        # Modal from the first row on: setValue pumps events, and a drop arriving
+        # before the dialog showed could clear generated_layers mid-loop.
+        # Cancel (or Esc) stops after the current row; files already written stay.
+        progress = QProgressDialog("Saving certificates...", "Cancel", 0, len(self.generated_layers), self)
+        progress.setWindowModality(Qt.WindowModality.WindowModal)
+        progress.setMinimumDuration(0)
+        progress.setValue(0)
+        self._busy = True
+        try:
+            with ThreadPoolExecutor(max_workers=workers) as pool:
+                for i, layer in enumerate(self.generated_layers, start=1):
+                    if progress.wasCanceled():
+                        break
+                    painter = QPainter(scratch)
+                    for pos, tile in layer:
+                        painter.drawImage(pos, tile)
+                    painter.end()
+                    path = os.path.join(directory, f"certificate_{i:03d}.jpg")
+                    if use_fast:
+                        pending.append((path, pool.submit(save_snapshot_jpg, jpeg_snapshot(scratch), path, self.jpeg_quality)))
+                        while len(pending) > max_pending:
+                            done_path, job = pending.popleft()
+                            if not job.result():
+                                failed.append(done_path)
+                    elif not write_qimage_jpg(scratch, path, self.jpeg_quality):
+                        failed.append(path)
+                    painter = QPainter(scratch)
+                    painter.setCompositionMode(QPainter.CompositionMode.CompositionMode_Source)
+                    for pos, tile in layer:
+                        area = QRect(pos, tile.size())
+                        painter.drawImage(area, base, area)
+                    painter.end()
+                    progress.setValue(i)
+        finally:
+            self._busy = False
+            progress.close()
+        failed.extend(path for path, job in pending if not job.result())
+        for path in failed:
+            QMessageBox.critical(self, "Error", f"Failed to save: {path}")
+
     def _save_qimage_jpg(self, img: QImage, path: str):
-        # Maintain original size; QImage.save with JPEG keeps dimensions
-        if not img.save(path, "JPG", quality=95):
+        # Maintain original size; the JPEG keeps the image dimensions
+        if not save_qimage_jpg(img, path, self.jpeg_quality):
             QMessageBox.critical(self, "Error", f"Failed to save: {path}")
 
     def reset_generated_outputs(self):
-        self.generated_images.clear()
-        self.generated_pixmaps.clear()
+        self.generated_layers.clear()
+        self.generated_list.populate(0, None)  # its rows pointed into generated_layers
         self.generated_list.setVisible(False)
         self.template_canvas.setVisible(True)
 
     def reset_all(self):
         self.template_path = None
         self.template_img = None
+        self._pending_edits.clear()
         self.masks.clear()
+        self.mask_by_letter.clear()
+        self._label_to_letter = None
         self.assignments.clear()
         self.styles.clear()
         self.reset_generated_outputs()
@@ -1530,10 +2430,11 @@ class MainWindow(QMainWindow):
         self.template_canvas.setVisible(False)
         self.generated_list.setVisible(True)
         # Pass Excel data rows for search
-        if hasattr(self, 'excel_data_rows'):
-            self.generated_list.populate(self.generated_pixmaps, self.excel_data_rows)
+        count = len(self.generated_layers)
+        if hasattr(self, 'excel_search_keys'):
+            self.generated_list.populate(count, self._thumbnail, self.excel_search_keys)
         else:
-            self.generated_list.populate(self.generated_pixmaps)
+            self.generated_list.populate(count, self._thumbnail)
 
     def show_template_preview(self):
         self.generated_list.setVisible(False)